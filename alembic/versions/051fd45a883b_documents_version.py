@@ -0,0 +1,33 @@
+# pylint: disable=invalid-name
+"""documents version
+
+Revision ID: 051fd45a883b
+Revises: c13642ec6a94
+Create Date: 2026-10-16 21:18:45.030214
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "051fd45a883b"
+down_revision: Union[str, Sequence[str], None] = "c13642ec6a94"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column(
+        "documents",
+        sa.Column("version", sa.Integer(), server_default="1", nullable=False),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column("documents", "version")
@@ -0,0 +1,42 @@
+# pylint: disable=invalid-name
+"""add sync state
+
+Revision ID: 63e750e2af81
+Revises: 16af29010fce
+Create Date: 2026-10-16 20:35:12.418230
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "63e750e2af81"
+down_revision: Union[str, Sequence[str], None] = "16af29010fce"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "sync_state",
+        sa.Column("name", sa.String(length=50), nullable=False),
+        sa.Column("payload_hash", sa.String(length=64), nullable=True),
+        sa.Column("cursor", sa.Uuid(), nullable=True),
+        sa.Column(
+            "updated_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("now()"),
+            nullable=False,
+        ),
+        sa.PrimaryKeyConstraint("name"),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("sync_state")
@@ -0,0 +1,42 @@
+# pylint: disable=invalid-name
+"""add revoked tokens
+
+Revision ID: 7d3a1f52c9e4
+Revises: 051fd45a883b
+Create Date: 2026-10-16 22:41:07.512904
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "7d3a1f52c9e4"
+down_revision: Union[str, Sequence[str], None] = "051fd45a883b"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "revoked_tokens",
+        sa.Column("jti", sa.Uuid(), nullable=False),
+        sa.Column("expires_at", sa.DateTime(timezone=True), nullable=False),
+        sa.PrimaryKeyConstraint("jti"),
+    )
+    op.create_index(
+        op.f("ix_revoked_tokens_expires_at"),
+        "revoked_tokens",
+        ["expires_at"],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f("ix_revoked_tokens_expires_at"), table_name="revoked_tokens")
+    op.drop_table("revoked_tokens")
@@ -0,0 +1,63 @@
+# pylint: disable=invalid-name
+"""documents content jsonb
+
+Revision ID: 94e7b2d26ffc
+Revises: b4875823cb0b
+Create Date: 2026-10-16 20:52:37.104452
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = "94e7b2d26ffc"
+down_revision: Union[str, Sequence[str], None] = "b4875823cb0b"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.alter_column(
+        "documents",
+        "content",
+        existing_type=sa.JSON(),
+        type_=postgresql.JSONB(),
+        existing_nullable=False,
+        postgresql_using="content::jsonb",
+    )
+    # The column rewrite above is committed first; the GIN build then runs
+    # CONCURRENTLY, outside a transaction, so it does not block writes.
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_documents_content_gin",
+            "documents",
+            ["content"],
+            unique=False,
+            postgresql_using="gin",
+            postgresql_ops={"content": "jsonb_path_ops"},
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            "ix_documents_content_gin",
+            table_name="documents",
+            postgresql_concurrently=True,
+        )
+    op.alter_column(
+        "documents",
+        "content",
+        existing_type=postgresql.JSONB(),
+        type_=sa.JSON(),
+        existing_nullable=False,
+        postgresql_using="content::json",
+    )
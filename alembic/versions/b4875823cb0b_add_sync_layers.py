@@ -0,0 +1,42 @@
+# pylint: disable=invalid-name
+"""add sync layers
+
+Revision ID: b4875823cb0b
+Revises: 63e750e2af81
+Create Date: 2026-10-16 20:41:03.551907
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = "b4875823cb0b"
+down_revision: Union[str, Sequence[str], None] = "63e750e2af81"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "sync_layers",
+        sa.Column("version", sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column("payload", postgresql.JSONB(), nullable=False),
+        sa.Column(
+            "created_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("now()"),
+            nullable=False,
+        ),
+        sa.PrimaryKeyConstraint("version"),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("sync_layers")
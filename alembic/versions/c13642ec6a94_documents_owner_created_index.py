@@ -0,0 +1,43 @@
+# pylint: disable=invalid-name
+"""documents owner created index
+
+Revision ID: c13642ec6a94
+Revises: 94e7b2d26ffc
+Create Date: 2026-10-16 21:04:19.662871
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "c13642ec6a94"
+down_revision: Union[str, Sequence[str], None] = "94e7b2d26ffc"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # CONCURRENTLY does not block document writes during the build, but can
+    # not run inside a transaction.
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_documents_owner_created_id",
+            "documents",
+            ["owner_id", "created_at", "id"],
+            unique=False,
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            "ix_documents_owner_created_id",
+            table_name="documents",
+            postgresql_concurrently=True,
+        )
@@ -5,18 +5,16 @@
 
 from typing import Annotated
 
-import jwt
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from fastapi.responses import JSONResponse
 from pydantic import ValidationError
 from jwt.exceptions import InvalidTokenError
 from sqlalchemy.ext.asyncio import AsyncSession as Session
 
-from app.core.config import settings
+from app.core.crud import user as crud
 from app.core.db import get_session
-from app.core.models import User
-from app.core.schemas.token import TokenPayload
+from app.core.security import decode_token
+from app.core.schemas.user import UserPrincipal
 
 reusable_oauth2 = OAuth2PasswordBearer(tokenUrl="/api/v1/auth")
 
@@ -27,18 +25,20 @@ TokenDep = Annotated[str, Depends(reusable_oauth2)]
 async def get_current_user(
     session: SessionDep,
     token: TokenDep,
-) -> JSONResponse:
+) -> UserPrincipal:
     try:
-        payload = jwt.decode(
-            token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM]
-        )
-        token_data = TokenPayload(**payload)
+        token_data = decode_token(token)
     except (InvalidTokenError, ValidationError) as e:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Could not validate credentials",
         ) from e
-    user = await session.get(User, token_data.sub)
+    if token_data.type != "access":
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials",
+        )
+    user = await crud.get_principal(session, token_data.sub)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="User not found"
@@ -51,4 +51,4 @@ async def get_current_user(
     return user
 
 
-CurrentUser = Annotated[User, Depends(get_current_user)]
+CurrentUser = Annotated[UserPrincipal, Depends(get_current_user)]
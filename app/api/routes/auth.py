@@ -1,22 +1,66 @@
-"""Authentication route for user login via OAuth2 form in FastAPI.
-Handles token generation and user validation.
+"""Authentication routes for user login via OAuth2 form in FastAPI.
+Handles token generation, refresh and revocation, and user validation.
 """
 
-from datetime import timedelta
+import uuid
+from datetime import datetime, timedelta, timezone
 from typing import Annotated
 
 from fastapi import APIRouter, Depends, status, HTTPException
 from fastapi.security import OAuth2PasswordRequestForm
+from jwt.exceptions import InvalidTokenError
+from pydantic import ValidationError
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.api.deps import SessionDep
 from app.core.config import settings
+from app.core.crud import token as token_crud
 from app.core.crud import user as crud
-from app.core.security import create_access_token
-from app.core.schemas.token import Token
+from app.core.security import (
+    create_access_token,
+    create_refresh_token,
+    decode_token,
+)
+from app.core.schemas.token import RefreshRequest, Token, TokenPayload
 
 router = APIRouter(tags=["Auth"])
 
 
+def _issue_tokens(user_id: uuid.UUID) -> Token:
+    access_token = create_access_token(
+        user_id, expires_delta=timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+    )
+    refresh_token = create_refresh_token(
+        user_id, expires_delta=timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS)
+    )
+    return Token(access_token=access_token, refresh_token=refresh_token, type="bearer")
+
+
+def _refresh_claims(token: str) -> TokenPayload:
+    try:
+        token_data = decode_token(token)
+    except (InvalidTokenError, ValidationError) as e:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid refresh token.",
+        ) from e
+    if (
+        token_data.type != "refresh"
+        or token_data.sub is None
+        or token_data.jti is None
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid refresh token.",
+        )
+    return token_data
+
+
+async def _revoke(session: AsyncSession, token_data: TokenPayload) -> bool:
+    expires_at = datetime.fromtimestamp(token_data.exp, timezone.utc)
+    return await token_crud.revoke(session, token_data.jti, expires_at)
+
+
 @router.post("/auth")
 async def login(
     session: SessionDep, form_data: Annotated[OAuth2PasswordRequestForm, Depends()]
@@ -43,7 +87,36 @@ async def login(
             status_code=status.HTTP_403_FORBIDDEN, detail="Inactive user."
         )
 
-    access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
-    access_token = create_access_token(user.id, expires_delta=access_token_expires)
+    return _issue_tokens(user.id)
+
+
+@router.post("/auth/refresh")
+async def refresh(session: SessionDep, body: RefreshRequest) -> Token:
+    """Exchange a refresh token for a new access and refresh token pair.
+
+    No password check is involved. Each refresh token works once: it is put
+    on the denylist as it is exchanged, so a replayed token gets 401.
+    """
+    token_data = _refresh_claims(body.refresh_token)
+    user = await crud.get_principal(session, token_data.sub)
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid refresh token.",
+        )
+    if not user.is_active:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN, detail="Inactive user."
+        )
+    if not await _revoke(session, token_data):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Refresh token has been revoked.",
+        )
+    return _issue_tokens(user.id)
+
 
-    return Token(access_token=access_token, type="bearer")
+@router.post("/auth/revoke", status_code=status.HTTP_204_NO_CONTENT)
+async def revoke(session: SessionDep, body: RefreshRequest) -> None:
+    """Revoke a refresh token, e.g. on logout. Revoking twice is a no-op."""
+    await _revoke(session, _refresh_claims(body.refresh_token))
@@ -4,33 +4,94 @@
 - getting doc difference.
 """
 
-import copy
 import uuid
-from typing import Annotated, Any
+from datetime import datetime
+from typing import Annotated, Any, Literal
 
-from fastapi import APIRouter, Query, status
-from sqlalchemy import select, func
+from fastapi import (
+    APIRouter,
+    Body,
+    Header,
+    HTTPException,
+    Query,
+    Request,
+    Response,
+    status,
+)
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import TypeAdapter, ValidationError
+from sqlalchemy import select, func, tuple_
 
 from app.api.deps import SessionDep, CurrentUser
+from app.core.config import settings
 from app.core.models import Document
 from app.core.schemas.document import (
+    BatchItemError,
+    DocumentBatchOut,
     DocumentCreate,
+    DocumentFieldsOut,
+    DocumentImportOut,
     DocumentOut,
     DocumentPatch,
     DocumentListOut,
     DocumentDiff,
+    DocumentDiffBatch,
+    JsonPatchOperation,
 )
 from app.core.utils import docs as utils
+from app.core.utils import metrics
+from app.core.utils.jsonpatch import apply_patch
+from app.core.utils.ndjson import inflate
 
 router = APIRouter(prefix="/docs", tags=["Documents"])
 
+IfNoneMatchHeader = Annotated[str | None, Header()]
+IfMatchHeader = Annotated[str | None, Header()]
+_json_patch_adapter = TypeAdapter(list[JsonPatchOperation])
+_document_patch_adapter = TypeAdapter(DocumentPatch)
+FieldsQuery = Annotated[
+    str | None,
+    Query(description="Comma-separated subset of fields to return, e.g. `id,title`"),
+]
+
+
+def _validate_body(adapter: TypeAdapter, raw: bytes) -> Any:
+    """Validate a body read by hand, reporting errors like FastAPI does."""
+    try:
+        return adapter.validate_json(raw)
+    except ValidationError as e:
+        raise RequestValidationError(
+            [{**err, "loc": ("body", *err["loc"])} for err in e.errors()]
+        ) from e
+
+
+def _not_modified(etag: str) -> Response:
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+
+
+def _document_response(
+    doc: Document, etag: str | None = None, status_code: int = status.HTTP_200_OK
+) -> JSONResponse:
+    """Render ``doc`` as ``DocumentOut`` with a single ``json.dumps``.
+
+    Returning a response skips ``DocumentOut.model_validate`` and FastAPI's
+    response validation and serialization, which each walk the whole content.
+    """
+    headers = {"ETag": etag} if etag is not None else None
+    response = JSONResponse(
+        utils.document_json(doc), status_code=status_code, headers=headers
+    )
+    metrics.DOCUMENT_SIZE.observe(len(response.body))
+    return response
+
 
 @router.post("", response_model=DocumentOut, status_code=status.HTTP_201_CREATED)
 async def create_document(
     body: DocumentCreate,
     session: SessionDep,
     current_user: CurrentUser,
-) -> DocumentOut:
+) -> Response:
     doc = Document(
         title=body.title,
         doc_type=body.doc_type,
@@ -40,37 +101,87 @@ async def create_document(
     session.add(doc)
     await session.commit()
     await session.refresh(doc)
-    return DocumentOut.model_validate(doc)
+    return _document_response(doc, status_code=status.HTTP_201_CREATED)
 
 
-@router.get("", response_model=DocumentListOut)
+@router.get("", response_model=DocumentListOut, response_model_exclude_unset=True)
 async def list_documents(
     session: SessionDep,
     current_user: CurrentUser,
     limit: Annotated[int, Query(ge=1, le=100)] = 20,
     offset: Annotated[int, Query(ge=0)] = 0,
-) -> DocumentListOut:
-    count_q = (
-        select(func.count())
-        .select_from(Document)
-        .where(Document.owner_id == current_user.id)
-    )
-    total = (await session.execute(count_q)).scalar_one()
+    cursor: Annotated[
+        str | None, Query(description="Opaque cursor from a previous page")
+    ] = None,
+    count: Annotated[
+        Literal["exact", "estimated", "none"],
+        Query(description="How to compute `total`"),
+    ] = "exact",
+    fields: FieldsQuery = None,
+) -> Any:
+    if cursor is not None and offset:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="Use either cursor or offset, not both.",
+        )
 
+    if fields is None:
+        docs_q = select(Document, utils.current_layer())
+    else:
+        selected = utils.parse_fields(fields)
+        docs_q = select(*utils.field_columns(selected | {"id", "created_at"}))
     docs_q = (
-        select(Document)
-        .where(Document.owner_id == current_user.id)
-        .order_by(Document.created_at.desc())
-        .limit(limit)
-        .offset(offset)
+        docs_q.where(Document.owner_id == current_user.id)
+        .order_by(Document.created_at.desc(), Document.id.desc())
+        .limit(limit + 1)
     )
-    docs = (await session.execute(docs_q)).scalars().all()
+    if cursor is not None:
+        created_at, doc_id = utils.decode_cursor(cursor)
+        docs_q = docs_q.where(
+            tuple_(Document.created_at, Document.id) < tuple_(created_at, doc_id)
+        )
+    else:
+        docs_q = docs_q.offset(offset)
+    rows = (await session.execute(docs_q)).all()
+
+    if fields is None:
+        docs = [utils.apply_layer(doc, layer) for doc, layer in rows[:limit]]
+        items = [utils.document_json(d) for d in docs]
+    else:
+        docs = rows[:limit]
+        items = [DocumentFieldsOut(**utils.fields_row(r, selected)) for r in docs]
+
+    next_cursor = None
+    if len(rows) > limit:
+        next_cursor = utils.encode_cursor(docs[-1].created_at, docs[-1].id)
 
+    total = None
+    if count == "exact":
+        count_q = (
+            select(func.count())
+            .select_from(Document)
+            .where(Document.owner_id == current_user.id)
+        )
+        total = (await session.execute(count_q)).scalar_one()
+    elif count == "estimated":
+        total = await utils.estimate_owned(current_user.id, session)
+
+    if fields is None:
+        return JSONResponse(
+            {
+                "items": items,
+                "total": total,
+                "limit": limit,
+                "offset": offset,
+                "next_cursor": next_cursor,
+            }
+        )
     return DocumentListOut(
-        items=[DocumentOut.model_validate(d) for d in docs],
+        items=items,
         total=total,
         limit=limit,
         offset=offset,
+        next_cursor=next_cursor,
     )
 
 
@@ -80,40 +191,255 @@ async def diff_documents(
     current_user: CurrentUser,
     a: uuid.UUID = Query(..., description="First document ID"),
     b: uuid.UUID = Query(..., description="Second document ID"),
-) -> DocumentDiff:
-    doc_a = await utils.get_own_doc(a, current_user.id, session)
-    doc_b = await utils.get_own_doc(b, current_user.id, session)
-    return utils.diff(doc_a.content, doc_b.content)
+    list_key: Annotated[
+        str | None,
+        Query(description="Align lists of objects by this key instead of index"),
+    ] = None,
+    max_depth: Annotated[
+        int | None,
+        Query(ge=0, description="Report deeper differences as one change"),
+    ] = None,
+    max_changes: Annotated[
+        int | None,
+        Query(ge=1, description="Stop after this many entries"),
+    ] = None,
+) -> Response:
+    body = await utils.diff_own_docs(
+        a,
+        b,
+        current_user.id,
+        session,
+        list_key=list_key,
+        max_depth=max_depth,
+        max_changes=max_changes,
+    )
+    return Response(content=body, media_type="application/json")
+
+
+@router.post(
+    "/diff/batch",
+    response_class=StreamingResponse,
+    responses={200: {"content": {"application/x-ndjson": {}}}},
+)
+async def diff_documents_batch(
+    body: DocumentDiffBatch,
+    session: SessionDep,
+    current_user: CurrentUser,
+) -> StreamingResponse:
+    """Diff `base` against every target, streaming one NDJSON line per target.
+
+    Lines arrive in completion order as `{"target": id, "diff": {...}}`, or
+    as `{"id": id, "status_code": ..., "detail": ...}` for inaccessible targets.
+    """
+    if len(body.targets) > settings.DOCS_BATCH_MAX_SIZE:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"At most {settings.DOCS_BATCH_MAX_SIZE} targets per request.",
+        )
+    lines = await utils.diff_own_docs_many(
+        body.base,
+        body.targets,
+        current_user.id,
+        session,
+        list_key=body.list_key,
+        max_depth=body.max_depth,
+        max_changes=body.max_changes,
+    )
+    return StreamingResponse(lines, media_type="application/x-ndjson")
+
+
+@router.get(
+    "/export",
+    response_class=StreamingResponse,
+    responses={200: {"content": {"application/x-ndjson": {}}}},
+)
+async def export_documents(
+    current_user: CurrentUser,
+    doc_type: Annotated[
+        Literal["scroll", "parchment"] | None, Query(description="Only this type")
+    ] = None,
+    updated_since: Annotated[
+        datetime | None, Query(description="Only documents updated at or after")
+    ] = None,
+    fields: FieldsQuery = None,
+) -> StreamingResponse:
+    selected = set(utils.DOCUMENT_FIELDS)
+    if fields is not None:
+        selected = utils.parse_fields(fields)
+    return StreamingResponse(
+        utils.export_own_docs(current_user.id, selected, doc_type, updated_since),
+        media_type="application/x-ndjson",
+    )
+
+
+@router.post(
+    "/import",
+    response_model=DocumentImportOut,
+    openapi_extra={
+        "requestBody": {"content": {"application/x-ndjson": {}}, "required": True}
+    },
+)
+async def import_documents(
+    request: Request,
+    session: SessionDep,
+    current_user: CurrentUser,
+    content_encoding: Annotated[str | None, Header()] = None,
+) -> DocumentImportOut:
+    """Import NDJSON documents, one `POST /docs` body per line.
+
+    Send `Content-Encoding: gzip` for a compressed body.
+
+    Rows are committed in batches as they arrive. If the body turns out not
+    to be valid gzip part-way through, the committed batches are kept and the
+    400 response carries the summary so far. Its `imported` count is the
+    number of leading valid lines already stored; resend the body without
+    them rather than retrying it as is.
+    """
+    chunks = request.stream()
+    if content_encoding is not None:
+        if content_encoding.strip().lower() != "gzip":
+            raise HTTPException(
+                status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+                detail="Only gzip content encoding is supported.",
+            )
+        chunks = inflate(chunks)
+    return await utils.import_own_docs(chunks, current_user.id, session)
 
 
-@router.get("/{doc_id}", response_model=DocumentOut)
+def _batch_response(docs: list[Document], errors: list[BatchItemError]) -> Response:
+    return JSONResponse(
+        {
+            "items": [utils.document_json(d) for d in docs],
+            "errors": [e.model_dump(mode="json") for e in errors],
+        }
+    )
+
+
+@router.post("/batch", response_model=DocumentBatchOut)
+async def create_documents(
+    body: Annotated[
+        list[Any],
+        Body(
+            max_length=settings.DOCS_BATCH_MAX_SIZE,
+            description="Documents to create, in the `POST /docs` format",
+        ),
+    ],
+    session: SessionDep,
+    current_user: CurrentUser,
+) -> Response:
+    docs, errors = await utils.create_own_docs(body, current_user.id, session)
+    return _batch_response(docs, errors)
+
+
+@router.get("/batch", response_model=DocumentBatchOut)
+async def get_documents(
+    session: SessionDep,
+    current_user: CurrentUser,
+    ids: Annotated[
+        list[str],
+        Query(description="Document IDs, repeated or comma-separated"),
+    ],
+) -> Response:
+    ids = [i.strip() for value in ids for i in value.split(",") if i.strip()]
+    if len(ids) > settings.DOCS_BATCH_MAX_SIZE:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"At most {settings.DOCS_BATCH_MAX_SIZE} ids per request.",
+        )
+    docs, errors = await utils.get_own_docs(ids, current_user.id, session)
+    return _batch_response(docs, errors)
+
+
+@router.get(
+    "/{doc_id}",
+    response_model=DocumentOut | DocumentFieldsOut,
+    response_model_exclude_unset=True,
+)
 async def get_document(
     doc_id: uuid.UUID,
     session: SessionDep,
     current_user: CurrentUser,
-) -> DocumentOut:
-    doc = await utils.get_own_doc(doc_id, current_user.id, session)
-    return DocumentOut.model_validate(doc)
+    response: Response,
+    fields: FieldsQuery = None,
+    if_none_match: IfNoneMatchHeader = None,
+) -> Any:
+    if if_none_match is not None:
+        etag = await utils.get_own_etag(doc_id, current_user.id, session)
+        if utils.etag_matches(if_none_match, etag):
+            return _not_modified(etag)
 
+    if fields is not None:
+        selected = utils.parse_fields(fields)
+        row, etag = await utils.get_own_fields(
+            doc_id, current_user.id, selected, session
+        )
+        response.headers["ETag"] = etag
+        return DocumentFieldsOut(**row)
+    doc, etag = await utils.load_own_doc(doc_id, current_user.id, session)
+    return _document_response(doc, etag)
 
-@router.patch("/{doc_id}", response_model=DocumentOut)
+
+JSON_PATCH_MEDIA_TYPE = "application/json-patch+json"
+
+
+@router.patch(
+    "/{doc_id}",
+    response_model=DocumentOut,
+    openapi_extra={
+        "requestBody": {
+            "content": {
+                "application/json": {"schema": DocumentPatch.model_json_schema()},
+                JSON_PATCH_MEDIA_TYPE: {
+                    "schema": {
+                        "type": "array",
+                        "items": JsonPatchOperation.model_json_schema(),
+                    }
+                },
+            },
+            "required": True,
+        }
+    },
+)
 async def patch_document(
     doc_id: uuid.UUID,
-    body: DocumentPatch,
+    request: Request,
     session: SessionDep,
     current_user: CurrentUser,
-) -> DocumentOut:
-    doc = await utils.get_own_doc(doc_id, current_user.id, session)
+    if_match: IfMatchHeader = None,
+) -> Response:
+    """Update `title` and/or `content`, or apply an RFC 6902 JSON Patch to the
+    content when sent as `application/json-patch+json`.
 
-    if body.title is not None:
-        doc.title = body.title
-    if body.content is not None:
-        doc.content = body.content
+    All patch operations are applied atomically in one transaction.
+    """
+    raw = await request.body()
+    media_type = request.headers.get("content-type", "").split(";")[0].strip()
+    if media_type.lower() == JSON_PATCH_MEDIA_TYPE:
+        operations = _validate_body(_json_patch_adapter, raw)
+        doc, etag = await utils.patch_own_doc(
+            doc_id,
+            current_user.id,
+            lambda content: apply_patch(content, operations),
+            session,
+            if_match=if_match,
+        )
+        return _document_response(doc, etag)
 
-    session.add(doc)
-    await session.commit()
-    await session.refresh(doc)
-    return DocumentOut.model_validate(doc)
+    body = _validate_body(_document_patch_adapter, raw)
+    values = body.model_dump(exclude_none=True)
+    if values:
+        doc, etag = await utils.update_own_doc(
+            doc_id, current_user.id, values, session, if_match=if_match
+        )
+    else:
+        doc, etag = await utils.load_own_doc(doc_id, current_user.id, session)
+        if if_match is not None and not utils.etag_matches(if_match, etag):
+            raise HTTPException(
+                status_code=status.HTTP_412_PRECONDITION_FAILED,
+                detail="Document has been modified",
+                headers={"ETag": etag},
+            )
+    return _document_response(doc, etag)
 
 
 @router.delete("/{doc_id}", status_code=status.HTTP_204_NO_CONTENT)
@@ -133,9 +459,15 @@ async def get_by_path(
     key: str,
     session: SessionDep,
     current_user: CurrentUser,
+    if_none_match: IfNoneMatchHeader = None,
 ) -> Any:
-    doc = await utils.get_own_doc(doc_id, current_user.id, session)
-    return utils.resolve_path(doc.content, key)
+    if if_none_match is not None:
+        etag = await utils.get_own_etag(doc_id, current_user.id, session)
+        if utils.etag_matches(if_none_match, etag):
+            return _not_modified(etag)
+
+    value, etag = await utils.get_own_path(doc_id, current_user.id, key, session)
+    return JSONResponse(value, headers={"ETag": etag})
 
 
 @router.patch("/{doc_id}/path", response_model=DocumentOut)
@@ -145,15 +477,17 @@ async def patch_by_path(
     body: dict[str, Any],
     session: SessionDep,
     current_user: CurrentUser,
-) -> DocumentOut:
-    doc = await utils.get_own_doc(doc_id, current_user.id, session)
-    content = copy.deepcopy(doc.content)
-    utils.set_path(content, key, body)
-    doc.content = content
-    session.add(doc)
-    await session.commit()
-    await session.refresh(doc)
-    return DocumentOut.model_validate(doc)
+    if_match: IfMatchHeader = None,
+) -> Response:
+    """Set the value at `key`, creating missing intermediate objects.
+
+    Keys provided by the sync layer cannot be changed (409): the layer is
+    overlaid on every read and would hide the new value.
+    """
+    doc, etag = await utils.set_own_path(
+        doc_id, current_user.id, key, body, session, if_match=if_match
+    )
+    return _document_response(doc, etag)
 
 
 @router.delete("/{doc_id}/path", response_model=DocumentOut)
@@ -162,12 +496,10 @@ async def delete_by_path(
     key: str,
     session: SessionDep,
     current_user: CurrentUser,
-) -> DocumentOut:
-    doc = await utils.get_own_doc(doc_id, current_user.id, session)
-    content = copy.deepcopy(doc.content)
-    utils.delete_path(content, key)
-    doc.content = content
-    session.add(doc)
-    await session.commit()
-    await session.refresh(doc)
-    return DocumentOut.model_validate(doc)
+    if_match: IfMatchHeader = None,
+) -> Response:
+    """Delete the value at `key`; keys provided by the sync layer are a 409."""
+    doc, etag = await utils.delete_own_path(
+        doc_id, current_user.id, key, session, if_match=if_match
+    )
+    return _document_response(doc, etag)
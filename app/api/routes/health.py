@@ -1,6 +1,14 @@
 """Health endpoint for application."""
 
-from fastapi import APIRouter
+from fastapi import APIRouter, Response
+
+from app.api.deps import SessionDep
+from app.core.crud import user as user_crud
+from app.core.logging import log_stats
+from app.core.security import password_pool
+from app.core.utils import docs as docs_utils
+from app.core.utils import metrics
+from app.core.utils.leader import current_leader, instance_name, is_leader
 
 router = APIRouter(tags=["Health"])
 
@@ -8,3 +16,35 @@ router = APIRouter(tags=["Health"])
 @router.get("/health")
 async def health():
     return {"status": "ok"}
+
+
+@router.get("/health/sync")
+async def sync_health(session: SessionDep):
+    leader = await current_leader(session)
+    return {
+        "instance": instance_name(),
+        "leader": leader,
+        "is_leader": is_leader(leader),
+    }
+
+
+@router.get("/health/caches")
+async def caches_health():
+    return {
+        "users": user_crud.principal_cache.stats(),
+        "diffs": docs_utils.diff_cache.stats(),
+        "password_hashing": password_pool.stats(),
+    }
+
+
+@router.get("/health/logging")
+async def logging_health():
+    return log_stats()
+
+
+@router.get("/metrics")
+async def prometheus_metrics() -> Response:
+    """Metrics of the serving worker in the Prometheus text format."""
+    return Response(
+        content=metrics.REGISTRY.render(), media_type=metrics.CONTENT_TYPE
+    )
@@ -45,6 +45,7 @@ class Settings(BaseSettings):
     UVICORN_LOG_LEVEL: str
     UVICORN_WORKERS: int
     UVICORN_LIMIT_CONCURRENCY: int
+    UVICORN_TIMEOUT_GRACEFUL_SHUTDOWN: int = 30
 
     POSTGRES_HOST: str
     POSTGRES_PORT: int
@@ -52,12 +53,36 @@ class Settings(BaseSettings):
     POSTGRES_USERNAME: str
     POSTGRES_PASSWORD: str
 
+    LOG_FORMAT: Literal["text", "json"] = "text"
+    LOG_QUEUE_SIZE: int = 10000
+    METRICS_DIR: str | None = None
+    METRICS_FLUSH_SECONDS: float = 1.0
+
     SECRET_KEY: str
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 5
+    REFRESH_TOKEN_EXPIRE_DAYS: int = 7
+    REVOKED_TOKEN_PURGE_SECONDS: int = 3600
+    PASSWORD_HASH_WORKERS: int = 2
+    PASSWORD_HASH_MAX_PENDING: int = 32
+    USER_CACHE_TTL_SECONDS: int = 30
+    USER_CACHE_MAX_SIZE: int = 10000
+    DOCS_BATCH_MAX_SIZE: int = 1000
+    DOCS_EXPORT_BATCH_SIZE: int = 1000
+    DOCS_IMPORT_BATCH_SIZE: int = 5000
+    DOCS_IMPORT_MAX_LINE_BYTES: int = 16 * 1024 * 1024
+    DOCS_IMPORT_MAX_ERRORS: int = 100
+    DIFF_CACHE_MAX_SIZE: int = 1024
+    DIFF_CACHE_MAX_BYTES: int = 64 * 1024 * 1024
+    DIFF_WORKERS: int = 2
 
     SYNC_URL: str = "https://example.com/api/data"
     SYNC_INTERVAL_SECONDS: int = 30
+    SYNC_BATCH_SIZE: int = 5000
+    SYNC_IN_API: bool = True
+    SYNC_LEADER_RETRY_SECONDS: int = 5
+    SYNC_LAYER_HISTORY: int = 100
+    SYNC_MATERIALIZE: bool = False
 
     FIRST_SUPERUSER_NAME: str = "test"
     FIRST_SUPERUSER_PASSWORD: str = "test"
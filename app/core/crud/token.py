@@ -0,0 +1,38 @@
+"""CRUD operations for the refresh token denylist."""
+
+import uuid
+from datetime import datetime, timezone
+
+from sqlalchemy import delete
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession as Session
+
+from app.core.models import RevokedToken
+
+
+async def revoke(session: Session, jti: uuid.UUID, expires_at: datetime) -> bool:
+    """Put ``jti`` on the denylist until the token would expire anyway.
+
+    Returns ``False`` if it was already there. A single ``INSERT … ON CONFLICT
+    DO NOTHING`` decides it, so two concurrent uses of one refresh token can
+    not both succeed.
+    """
+    result = await session.execute(
+        insert(RevokedToken)
+        .values(jti=jti, expires_at=expires_at)
+        .on_conflict_do_nothing(index_elements=[RevokedToken.jti])
+        .returning(RevokedToken.jti)
+    )
+    revoked = result.scalar_one_or_none() is not None
+    await session.commit()
+    return revoked
+
+
+async def purge_expired(session: Session) -> None:
+    """Drop denylist entries of tokens that have expired on their own."""
+    await session.execute(
+        delete(RevokedToken).where(
+            RevokedToken.expires_at < datetime.now(timezone.utc)
+        )
+    )
+    await session.commit()
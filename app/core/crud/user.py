@@ -1,10 +1,19 @@
 """CRUD operations for managing authentication logic."""
 
-from sqlalchemy import select
+import uuid
+
+from sqlalchemy import select, update
 from sqlalchemy.ext.asyncio import AsyncSession as Session
 
+from app.core.config import settings
 from app.core.models import User
-from app.core.security import verify_password
+from app.core.schemas.user import UserPrincipal
+from app.core.security import verify_password_async
+from app.core.utils.cache import TTLCache
+
+principal_cache: TTLCache[uuid.UUID, UserPrincipal] = TTLCache(
+    maxsize=settings.USER_CACHE_MAX_SIZE, ttl=settings.USER_CACHE_TTL_SECONDS
+)
 
 
 async def get_user_by_username(session: Session, username: str) -> User | None:
@@ -16,6 +25,36 @@ async def authenticate(session: Session, username: str, password: str) -> User |
     db_user = await get_user_by_username(session=session, username=username)
     if not db_user:
         return None
-    if not verify_password(password, db_user.hashed_password):
+    if not await verify_password_async(password, db_user.hashed_password):
         return None
     return db_user
+
+
+async def get_principal(session: Session, user_id: uuid.UUID) -> UserPrincipal | None:
+    """Return the user principal, served from the cache when possible.
+
+    A cache hit does not touch the session, so no connection is checked out.
+    """
+    principal = principal_cache.get(user_id)
+    if principal is not None:
+        return principal
+
+    db_user = await session.get(User, user_id)
+    if not db_user:
+        return None
+    principal = UserPrincipal.model_validate(db_user)
+    principal_cache.set(user_id, principal)
+    return principal
+
+
+def invalidate_principal(user_id: uuid.UUID) -> None:
+    """Drop a cached principal, e.g. after the user was changed or deactivated."""
+    principal_cache.invalidate(user_id)
+
+
+async def set_active(session: Session, user_id: uuid.UUID, is_active: bool) -> None:
+    await session.execute(
+        update(User).where(User.id == user_id).values(is_active=is_active)
+    )
+    await session.commit()
+    invalidate_principal(user_id)
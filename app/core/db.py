@@ -4,15 +4,18 @@ import logging
 from typing import AsyncGenerator
 
 from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
 
 from app.core.config import settings
-from app.core.security import get_password_hash
+from app.core.security import get_password_hash_async
 from app.core.models import User
+from app.core.utils.metrics import TimedQueuePool, instrument_engine
 
 logger = logging.getLogger(settings.PROJECT_NAME)
 
-engine = create_async_engine(settings.database_url)
+engine = create_async_engine(settings.database_url, poolclass=TimedQueuePool)
+instrument_engine(engine)
 async_session = async_sessionmaker(engine, expire_on_commit=False, class_=AsyncSession)
 
 
@@ -36,9 +39,20 @@ async def init_superuser() -> None:
 
         superuser = User(
             username=settings.FIRST_SUPERUSER_NAME,
-            hashed_password=get_password_hash(settings.FIRST_SUPERUSER_PASSWORD),
+            hashed_password=await get_password_hash_async(
+                settings.FIRST_SUPERUSER_PASSWORD
+            ),
             is_active=True,
         )
         session.add(superuser)
-        await session.commit()
+        try:
+            await session.commit()
+        except IntegrityError:
+            # Another worker created it concurrently.
+            await session.rollback()
+            logger.debug(
+                "Superuser '%s' already exists, skipping.",
+                settings.FIRST_SUPERUSER_NAME,
+            )
+            return
         logger.info("Superuser '%s' created.", settings.FIRST_SUPERUSER_NAME)
@@ -1,6 +1,25 @@
-"""Custom logging utilities with colorized console output."""
+"""Custom logging utilities with colorized console output.
 
+Records are never written on the calling thread: loggers get a
+:class:`DroppingQueueHandler` that puts them on a bounded in-memory queue, and
+a :class:`logging.handlers.QueueListener` thread formats and writes them to
+the console and the log file. The application logger and uvicorn's loggers
+(see ``logging.yaml``) share the same pipeline.
+"""
+
+import atexit
+import copy
+import functools
+import json
 import logging
+import os
+import queue
+import sys
+from logging.handlers import QueueHandler, QueueListener
+
+from app.core.config import settings
+
+DATEFMT = "%Y-%m-%d %H:%M:%S"
 
 
 class CustomFormatter(logging.Formatter):  # pylint: disable=missing-class-docstring
@@ -14,31 +33,127 @@ class CustomFormatter(logging.Formatter):  # pylint: disable=missing-class-docst
         logging.CRITICAL: "\033[91m\033[5m" + LOG_LEVEL + "\033[0m",
     }
 
+    def __init__(self) -> None:
+        super().__init__(self.LOG_LEVEL + self.FORMAT, datefmt=DATEFMT)
+        self._formatters = {
+            level: logging.Formatter(prefix + self.FORMAT, datefmt=DATEFMT)
+            for level, prefix in self.FORMATS.items()
+        }
+
     def format(self, record):
-        log_fmt = self.FORMATS.get(record.levelno) + self.FORMAT
-        formatter = logging.Formatter(log_fmt, datefmt="%Y-%m-%d %H:%M:%S")
+        formatter = self._formatters.get(record.levelno)
+        if formatter is None:
+            return super().format(record)
         return formatter.format(record)
 
 
-def setup_logger(name: str, log_file: str, level=logging.DEBUG):
-    logger = logging.getLogger(name)
-    logger.propagate = False
-    logger.setLevel(level)
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record, for log collectors."""
 
-    file_handler = logging.FileHandler(log_file)
-    file_handler.setLevel(level)
-    file_handler.setFormatter(
-        logging.Formatter(
+    def __init__(self) -> None:
+        super().__init__(datefmt=DATEFMT)
+
+    def format(self, record):
+        data = {
+            "time": self.formatTime(record, self.datefmt),
+            "level": record.levelname,
+            "logger": record.name,
+            "location": f"{record.filename}:{record.lineno}",
+            "process": record.process,
+            "message": record.getMessage(),
+        }
+        if record.exc_info:
+            data["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+
+class DroppingQueueHandler(QueueHandler):
+    """``QueueHandler`` that drops records when the queue is full.
+
+    Logging never blocks the caller: on overflow the record is discarded and
+    counted in ``dropped``. Only the message (and traceback) is rendered
+    here, so later changes to mutable arguments do not leak into the log;
+    the level, time and layout are formatted by the listener thread.
+    """
+
+    _exc_formatter = logging.Formatter()
+
+    def __init__(self, log_queue: queue.Queue) -> None:
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        message = record.getMessage()
+        if record.exc_info:
+            message += "\n" + self._exc_formatter.formatException(record.exc_info)
+        elif record.exc_text:
+            message += "\n" + record.exc_text
+        record = copy.copy(record)
+        record.message = record.msg = message
+        record.args = None
+        record.exc_info = None
+        record.exc_text = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+_queue_handlers: list[DroppingQueueHandler] = []
+
+
+def queue_handler(log_file: str) -> DroppingQueueHandler:
+    """Process-wide handler feeding the console and ``log_file``.
+
+    Builds the formatters and output handlers once per file and starts the
+    listener thread on first use; it is stopped, after draining the queue, at
+    exit. ``logging.yaml`` and :func:`setup_logger` get the same handler for
+    the same file, however they call this and spell the path.
+    """
+    return _queue_handler(os.path.abspath(log_file))
+
+
+@functools.cache
+def _queue_handler(log_file: str) -> DroppingQueueHandler:
+    if settings.LOG_FORMAT == "json":
+        console_formatter = file_formatter = JsonFormatter()
+    else:
+        console_formatter = CustomFormatter()
+        file_formatter = logging.Formatter(
             "%(asctime)s [%(levelname)s] [%(filename)s:%(lineno)d] %(message)s",
-            datefmt="%Y-%m-%d %H:%M:%S",
+            datefmt=DATEFMT,
         )
-    )
 
-    console_handler = logging.StreamHandler()
-    console_handler.setLevel(level)
-    console_handler.setFormatter(CustomFormatter())
+    console_handler = logging.StreamHandler(sys.stdout)
+    console_handler.setFormatter(console_formatter)
+    file_handler = logging.FileHandler(log_file)
+    file_handler.setFormatter(file_formatter)
 
-    logger.addHandler(file_handler)
-    logger.addHandler(console_handler)
+    log_queue: queue.Queue = queue.Queue(maxsize=settings.LOG_QUEUE_SIZE)
+    listener = QueueListener(log_queue, console_handler, file_handler)
+    listener.start()
+    atexit.register(listener.stop)
+    handler = DroppingQueueHandler(log_queue)
+    _queue_handlers.append(handler)
+    return handler
 
+
+def log_stats() -> dict[str, int]:
+    """Queue depth and dropped records of the pipelines of this process."""
+    return {
+        "queued": sum(h.queue.qsize() for h in _queue_handlers),
+        "dropped": sum(h.dropped for h in _queue_handlers),
+    }
+
+
+def setup_logger(name: str, log_file: str, level=logging.DEBUG):
+    logger = logging.getLogger(name)
+    if logger.handlers:
+        return logger
+    logger.propagate = False
+    logger.setLevel(level)
+    logger.addHandler(queue_handler(log_file))
     return logger
@@ -3,7 +3,8 @@
 import uuid
 from datetime import datetime
 
-from sqlalchemy import String, Boolean, DateTime, Text, ForeignKey, JSON
+from sqlalchemy import String, Boolean, DateTime, Text, ForeignKey, Index, Integer
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.sql import func
 from sqlalchemy.orm import declarative_base, Mapped, mapped_column, relationship
 
@@ -35,8 +36,11 @@ class Document(Base):  # pylint: disable=missing-class-docstring
     doc_type: Mapped[str] = mapped_column(
         String(50), nullable=False, default="parchment"
     )
-    content: Mapped[dict] = mapped_column(JSON, nullable=False, default=dict)
+    content: Mapped[dict] = mapped_column(JSONB, nullable=False, default=dict)
     owner_id: Mapped[uuid.UUID] = mapped_column(ForeignKey("users.id"), nullable=False)
+    version: Mapped[int] = mapped_column(
+        Integer, nullable=False, default=1, server_default="1"
+    )
     created_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True), server_default=func.now()
     )
@@ -45,3 +49,43 @@ class Document(Base):  # pylint: disable=missing-class-docstring
     )
 
     owner: Mapped["User"] = relationship("User", back_populates="documents")
+
+    __table_args__ = (
+        Index("ix_documents_owner_created_id", "owner_id", "created_at", "id"),
+        Index(
+            "ix_documents_content_gin",
+            "content",
+            postgresql_using="gin",
+            postgresql_ops={"content": "jsonb_path_ops"},
+        ),
+    )
+
+
+class SyncState(Base):  # pylint: disable=missing-class-docstring
+    __tablename__ = "sync_state"
+
+    name: Mapped[str] = mapped_column(String(50), primary_key=True)
+    payload_hash: Mapped[str | None] = mapped_column(String(64), nullable=True)
+    cursor: Mapped[uuid.UUID | None] = mapped_column(nullable=True)
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), onupdate=func.now()
+    )
+
+
+class SyncLayer(Base):  # pylint: disable=missing-class-docstring
+    __tablename__ = "sync_layers"
+
+    version: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
+    payload: Mapped[dict] = mapped_column(JSONB, nullable=False)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now()
+    )
+
+
+class RevokedToken(Base):  # pylint: disable=missing-class-docstring
+    __tablename__ = "revoked_tokens"
+
+    jti: Mapped[uuid.UUID] = mapped_column(primary_key=True)
+    expires_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), nullable=False, index=True
+    )
@@ -2,13 +2,13 @@
 
 import uuid
 from datetime import datetime
-from typing import Any
+from typing import Any, Literal
 
-from pydantic import BaseModel, field_validator
+from pydantic import BaseModel, Field, field_validator, model_validator
 
 
 class DocumentCreate(BaseModel):
-    title: str
+    title: str = Field(max_length=255)
     doc_type: str = "parchment"
     content: dict[str, Any]
 
@@ -25,6 +25,26 @@ class DocumentPatch(BaseModel):
     content: dict[str, Any] | None = None
 
 
+class JsonPatchOperation(BaseModel):
+    """A single RFC 6902 operation."""
+
+    op: Literal["add", "remove", "replace", "move", "copy", "test"]
+    path: str
+    value: Any = None
+    from_: str | None = Field(default=None, alias="from")
+
+    @model_validator(mode="after")
+    def check_arguments(self) -> "JsonPatchOperation":
+        if (
+            self.op in ("add", "replace", "test")
+            and "value" not in self.model_fields_set
+        ):
+            raise ValueError(f"'{self.op}' requires 'value'")
+        if self.op in ("move", "copy") and self.from_ is None:
+            raise ValueError(f"'{self.op}' requires 'from'")
+        return self
+
+
 class DocumentOut(BaseModel):
     id: uuid.UUID
     title: str
@@ -33,15 +53,60 @@ class DocumentOut(BaseModel):
     owner_id: uuid.UUID
     created_at: datetime
     updated_at: datetime
+    version: int
 
     model_config = {"from_attributes": True}
 
 
+class DocumentFieldsOut(BaseModel):
+    """Sparse document representation holding only the requested fields."""
+
+    id: uuid.UUID | None = None
+    title: str | None = None
+    doc_type: str | None = None
+    content: dict[str, Any] | None = None
+    owner_id: uuid.UUID | None = None
+    created_at: datetime | None = None
+    updated_at: datetime | None = None
+    version: int | None = None
+
+
 class DocumentListOut(BaseModel):
-    items: list[DocumentOut]
-    total: int
+    items: list[DocumentOut | DocumentFieldsOut]
+    total: int | None
     limit: int
     offset: int
+    next_cursor: str | None = None
+
+
+class BatchItemError(BaseModel):
+    """Failure of a single batch item, addressed by index, id or line number."""
+
+    index: int | None = None
+    id: str | None = None
+    line: int | None = None
+    status_code: int
+    detail: Any
+
+
+class DocumentBatchOut(BaseModel):
+    items: list[DocumentOut]
+    errors: list[BatchItemError]
+
+
+class DocumentDiffBatch(BaseModel):
+    base: uuid.UUID
+    targets: list[uuid.UUID]
+    list_key: str | None = None
+    max_depth: int | None = Field(default=None, ge=0)
+    max_changes: int | None = Field(default=None, ge=1)
+
+
+class DocumentImportOut(BaseModel):
+    lines: int
+    imported: int
+    failed: int
+    errors: list[BatchItemError]
 
 
 class DiffValue(BaseModel):
@@ -53,3 +118,4 @@ class DocumentDiff(BaseModel):
     added: dict[str, Any]
     removed: dict[str, Any]
     changed: dict[str, DiffValue]
+    truncated: bool = False
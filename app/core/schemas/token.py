@@ -1,16 +1,24 @@
 """Pydantic schemas for JWT token handling."""
 
 import uuid
+from typing import Literal
 
 from pydantic import BaseModel
 
 
 class Token(BaseModel):
     access_token: str
+    refresh_token: str | None = None
     type: str = "bearer"
 
 
+class RefreshRequest(BaseModel):
+    refresh_token: str
+
+
 class TokenPayload(BaseModel):
     sub: uuid.UUID | None = None
     exp: int
     jti: uuid.UUID | None = None
+    # Tokens issued before refresh tokens existed carry no type.
+    type: Literal["access", "refresh"] = "access"
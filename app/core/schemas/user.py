@@ -0,0 +1,15 @@
+"""Pydantic schemas for authenticated user handling."""
+
+import uuid
+
+from pydantic import BaseModel
+
+
+class UserPrincipal(BaseModel):
+    """Immutable snapshot of an authenticated user, safe to share and cache."""
+
+    id: uuid.UUID
+    username: str
+    is_active: bool
+
+    model_config = {"from_attributes": True, "frozen": True}
@@ -1,13 +1,18 @@
 """Security utilities for password hashing and JWT token creation."""
 
+import asyncio
 import uuid
+from concurrent.futures import ThreadPoolExecutor
 from datetime import timedelta, datetime, timezone
+from typing import Any, Callable
 
 import jwt
+from fastapi import HTTPException, status
 from pwdlib import PasswordHash
 from pwdlib.hashers.bcrypt import BcryptHasher
 
 from app.core.config import settings
+from app.core.schemas.token import TokenPayload
 
 pwd_hash = PasswordHash([BcryptHasher()])
 
@@ -20,13 +25,101 @@ def get_password_hash(password: str) -> str:
     return pwd_hash.hash(password)
 
 
-def create_access_token(
-    subject: str, expires_delta: timedelta = timedelta(minutes=15)
-) -> str:
+class PasswordPool:
+    """Bounded thread pool for bcrypt, keeping it off the event loop.
+
+    bcrypt releases the GIL while hashing, so ``PASSWORD_HASH_WORKERS``
+    threads hash in parallel with request handling. At most
+    ``PASSWORD_HASH_MAX_PENDING`` calls may be running or queued per process;
+    further calls are rejected with 503 instead of piling up.
+    """
+
+    def __init__(self, workers: int, max_pending: int) -> None:
+        self.workers = workers
+        self.max_pending = max_pending
+        self.pending = 0
+        self.rejected = 0
+        self._executor: ThreadPoolExecutor | None = None
+
+    async def run(self, func: Callable[..., Any], *args: Any) -> Any:
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Too many concurrent logins, retry later.",
+                headers={"Retry-After": "1"},
+            )
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.workers, thread_name_prefix="password-hash"
+            )
+        self.pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, func, *args)
+        finally:
+            self.pending -= 1
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(cancel_futures=True)
+            self._executor = None
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "workers": self.workers,
+            "max_pending": self.max_pending,
+            "pending": self.pending,
+            "rejected": self.rejected,
+        }
+
+
+password_pool = PasswordPool(
+    workers=settings.PASSWORD_HASH_WORKERS,
+    max_pending=settings.PASSWORD_HASH_MAX_PENDING,
+)
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """:func:`verify_password` in :data:`password_pool`."""
+    return await password_pool.run(verify_password, plain_password, hashed_password)
+
+
+async def get_password_hash_async(password: str) -> str:
+    """:func:`get_password_hash` in :data:`password_pool`."""
+    return await password_pool.run(get_password_hash, password)
+
+
+def _create_token(subject: str, expires_delta: timedelta, token_type: str) -> str:
     jti = str(uuid.uuid4())
     expire = datetime.now(timezone.utc) + expires_delta
-    to_encode = {"exp": expire, "sub": str(subject), "jti": jti}
+    to_encode = {"exp": expire, "sub": str(subject), "jti": jti, "type": token_type}
     encoded_jwt = jwt.encode(
         to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM
     )
     return encoded_jwt
+
+
+def create_access_token(
+    subject: str, expires_delta: timedelta = timedelta(minutes=15)
+) -> str:
+    return _create_token(subject, expires_delta, "access")
+
+
+def create_refresh_token(
+    subject: str, expires_delta: timedelta = timedelta(days=7)
+) -> str:
+    """Long-lived token that can only be exchanged for new tokens.
+
+    Its ``jti`` is put on the denylist when it is used or revoked.
+    """
+    return _create_token(subject, expires_delta, "refresh")
+
+
+def decode_token(token: str) -> TokenPayload:
+    """Verify a token and return its claims.
+
+    Raises ``jwt.InvalidTokenError`` or ``pydantic.ValidationError``.
+    """
+    payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+    return TokenPayload(**payload)
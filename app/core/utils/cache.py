@@ -0,0 +1,122 @@
+"""In-process caches with bounded size and hit/miss accounting."""
+
+import time
+from collections import OrderedDict
+from typing import Any, Generic, Hashable, TypeVar
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+class TTLCache(Generic[K, V]):
+    """LRU cache whose entries expire ``ttl`` seconds after being stored.
+
+    Not thread-safe; meant to be used from the event loop only. Every process
+    holds its own copy, so ``ttl`` bounds how stale an entry can get when it
+    is invalidated in another process.
+    """
+
+    def __init__(self, maxsize: int, ttl: float) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data: OrderedDict[K, tuple[float, V]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: K) -> V | None:
+        item = self._data.get(key)
+        if item is None or item[0] < time.monotonic():
+            if item is not None:
+                del self._data[key]
+            self.misses += 1
+            return None
+        self._data.move_to_end(key)
+        self.hits += 1
+        return item[1]
+
+    def set(self, key: K, value: V) -> None:
+        if self.maxsize <= 0:
+            return
+        self._data[key] = (time.monotonic() + self.ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def invalidate(self, key: K) -> None:
+        self._data.pop(key, None)
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    def stats(self) -> dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+class LRUCache(Generic[K, V]):
+    """LRU cache bounded both by entry count and by the total entry weight.
+
+    The weight of an entry (typically its size in bytes) is given by the
+    caller. Entries heavier than ``max_weight`` are not stored. Not
+    thread-safe; meant to be used from the event loop only.
+    """
+
+    def __init__(self, maxsize: int, max_weight: int) -> None:
+        self.maxsize = maxsize
+        self.max_weight = max_weight
+        self.weight = 0
+        self.hits = 0
+        self.misses = 0
+        self._data: OrderedDict[K, tuple[int, V]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: K) -> V | None:
+        item = self._data.get(key)
+        if item is None:
+            self.misses += 1
+            return None
+        self._data.move_to_end(key)
+        self.hits += 1
+        return item[1]
+
+    def set(self, key: K, value: V, weight: int) -> None:
+        if self.maxsize <= 0 or weight > self.max_weight:
+            return
+        self.invalidate(key)
+        self._data[key] = (weight, value)
+        self.weight += weight
+        while len(self._data) > self.maxsize or self.weight > self.max_weight:
+            _, (evicted, _) = self._data.popitem(last=False)
+            self.weight -= evicted
+
+    def invalidate(self, key: K) -> None:
+        item = self._data.pop(key, None)
+        if item is not None:
+            self.weight -= item[0]
+
+    def clear(self) -> None:
+        self._data.clear()
+        self.weight = 0
+
+    def stats(self) -> dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "weight": self.weight,
+            "max_weight": self.max_weight,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
@@ -1,34 +1,792 @@
 """Utilities-helpers for docs routes."""
 
+import asyncio
+import base64
+import binascii
+import functools
+import json
+import multiprocessing
 import uuid
-from typing import Any
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+from typing import Any, AsyncIterable, AsyncIterator, Callable
 
 from fastapi import HTTPException, status
+from pydantic import TypeAdapter, ValidationError
+from sqlalchemy import (
+    Boolean,
+    Text,
+    case,
+    cast,
+    func,
+    insert,
+    literal,
+    or_,
+    select,
+    text,
+    update,
+)
+from sqlalchemy.dialects.postgresql import ARRAY, JSONB
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm.attributes import set_committed_value
 
-from app.core.models import Document
-from app.core.schemas.document import DiffValue, DocumentDiff
+from app.core.config import settings
+from app.core.db import async_session
+from app.core.models import Document, SyncLayer
+from app.core.schemas.document import (
+    BatchItemError,
+    DiffValue,
+    DocumentCreate,
+    DocumentDiff,
+    DocumentFieldsOut,
+    DocumentImportOut,
+)
+from app.core.utils.cache import LRUCache
+from app.core.utils.ndjson import iter_lines
 
 
-async def get_own_doc(
+def current_layer():
+    """Scalar subquery selecting the payload of the latest sync layer."""
+    return (
+        select(SyncLayer.payload)
+        .order_by(SyncLayer.version.desc())
+        .limit(1)
+        .scalar_subquery()
+    )
+
+
+def current_layer_version():
+    """Scalar subquery selecting the latest sync layer version, 0 if none."""
+    return (
+        select(func.coalesce(func.max(SyncLayer.version), 0))
+        .scalar_subquery()
+        .label("layer_version")
+    )
+
+
+def make_etag(version: int, layer_version: int) -> str:
+    """Entity tag of a document as seen by readers.
+
+    Readers get the sync layer overlaid, so the tag covers both the document
+    version and the layer version.
+    """
+    return f'"{version}.{layer_version}"'
+
+
+def _parse_etag(tag: str) -> tuple[int, int] | None:
+    tag = tag.strip().removeprefix("W/").strip('"')
+    version, _, layer_version = tag.partition(".")
+    if not all(v.isascii() and v.isdigit() for v in (version, layer_version)):
+        return None
+    return int(version), int(layer_version)
+
+
+def etag_matches(header: str, etag: str) -> bool:
+    """Weak comparison of ``etag`` against an ``If-None-Match`` header."""
+    if header.strip() == "*":
+        return True
+    return _parse_etag(etag) in {_parse_etag(tag) for tag in header.split(",")}
+
+
+def _if_match(header: str | None):
+    """Condition for an ``If-Match`` header, evaluated on the locked row."""
+    if header is None or header.strip() == "*":
+        return literal(True)
+    tags = [t for t in (_parse_etag(tag) for tag in header.split(",")) if t]
+    return or_(
+        literal(False),
+        *[
+            (Document.version == version) & (current_layer_version() == layer_version)
+            for version, layer_version in tags
+        ],
+    )
+
+
+def apply_layer(doc: Document, layer: dict[str, Any] | None) -> Document:
+    """Overlay the sync layer onto the document content.
+
+    Equivalent to the root merge the sync task used to write into every row.
+    The overlaid content is set as the committed value, so loading a document
+    never marks it dirty.
+    """
+    if layer:
+        set_committed_value(doc, "content", {**doc.content, **layer})
+    return doc
+
+
+async def load_own_doc(
     doc_id: uuid.UUID,
     owner_id: uuid.UUID,
     session: AsyncSession,
-) -> Document:
-    doc = await session.get(Document, doc_id)
-    if not doc:
+) -> tuple[Document, str]:
+    """Load an owned document with the sync layer applied and its ETag."""
+    result = await session.execute(
+        select(Document, current_layer(), current_layer_version()).where(
+            Document.id == doc_id
+        )
+    )
+    row = result.one_or_none()
+    if not row:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Document not found"
         )
+    doc, layer, layer_version = row
     if doc.owner_id != owner_id:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN, detail="Access denied"
         )
+    return apply_layer(doc, layer), make_etag(doc.version, layer_version)
+
+
+async def get_own_doc(
+    doc_id: uuid.UUID,
+    owner_id: uuid.UUID,
+    session: AsyncSession,
+) -> Document:
+    doc, _ = await load_own_doc(doc_id, owner_id, session)
     return doc
 
 
+async def get_own_etag(
+    doc_id: uuid.UUID,
+    owner_id: uuid.UUID,
+    session: AsyncSession,
+) -> str:
+    """Current ETag of an owned document, without reading its content."""
+    result = await session.execute(
+        select(Document.owner_id, Document.version, current_layer_version()).where(
+            Document.id == doc_id
+        )
+    )
+    row = result.one_or_none()
+    if not row:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Document not found"
+        )
+    if row.owner_id != owner_id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN, detail="Access denied"
+        )
+    return make_etag(row.version, row.layer_version)
+
+
+async def create_own_docs(
+    items: list[Any],
+    owner_id: uuid.UUID,
+    session: AsyncSession,
+) -> tuple[list[Document], list[BatchItemError]]:
+    """Validate ``items`` one by one and insert the valid ones in one transaction.
+
+    Invalid items are reported by their index and do not stop the others. The
+    rows are sent as multi-row ``INSERT … RETURNING`` statements and come back
+    in input order.
+    """
+    rows, errors = [], []
+    for index, item in enumerate(items):
+        try:
+            body = DocumentCreate.model_validate(item)
+        except ValidationError as e:
+            errors.append(
+                BatchItemError(
+                    index=index,
+                    status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                    detail=e.errors(include_url=False, include_context=False),
+                )
+            )
+            continue
+        rows.append({**body.model_dump(), "owner_id": owner_id})
+
+    if not rows:
+        return [], errors
+    result = await session.scalars(
+        insert(Document).returning(Document, sort_by_parameter_order=True), rows
+    )
+    docs = list(result)
+    await session.commit()
+    return docs, errors
+
+
+async def get_own_docs(
+    ids: list[str],
+    owner_id: uuid.UUID,
+    session: AsyncSession,
+) -> tuple[list[Document], list[BatchItemError]]:
+    """Load many owned documents with a single query.
+
+    Documents are returned in request order; ids that are malformed, missing
+    or owned by somebody else are reported as per-id errors.
+    """
+    parsed, errors = {}, []
+    for raw in ids:
+        try:
+            parsed.setdefault(uuid.UUID(raw), raw)
+        except ValueError:
+            errors.append(
+                BatchItemError(
+                    id=raw,
+                    status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                    detail="Invalid document id",
+                )
+            )
+
+    found = {}
+    if parsed:
+        result = await session.execute(
+            select(Document, current_layer()).where(Document.id.in_(list(parsed)))
+        )
+        found = {doc.id: apply_layer(doc, layer) for doc, layer in result}
+
+    docs = []
+    for doc_id, raw in parsed.items():
+        doc = found.get(doc_id)
+        if doc is None:
+            errors.append(
+                BatchItemError(
+                    id=raw,
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail="Document not found",
+                )
+            )
+        elif doc.owner_id != owner_id:
+            errors.append(
+                BatchItemError(
+                    id=raw,
+                    status_code=status.HTTP_403_FORBIDDEN,
+                    detail="Access denied",
+                )
+            )
+        else:
+            docs.append(doc)
+    return docs, errors
+
+
+DOCUMENT_FIELDS = (
+    "id",
+    "title",
+    "doc_type",
+    "content",
+    "owner_id",
+    "created_at",
+    "updated_at",
+    "version",
+)
+
+
+_datetime_adapter = TypeAdapter(datetime)
+
+
+def document_json(doc: Document) -> dict[str, Any]:
+    """``DocumentOut`` of ``doc`` as JSON-ready data, content passed through.
+
+    The content comes from JSONB and is already plain JSON data, so it is not
+    validated nor walked again; the other fields are dumped as Pydantic does,
+    which keeps the rendered bytes identical to ``DocumentOut``'s.
+    """
+    return {
+        "id": str(doc.id),
+        "title": doc.title,
+        "doc_type": doc.doc_type,
+        "content": doc.content,
+        "owner_id": str(doc.owner_id),
+        "created_at": _datetime_adapter.dump_python(doc.created_at, mode="json"),
+        "updated_at": _datetime_adapter.dump_python(doc.updated_at, mode="json"),
+        "version": doc.version,
+    }
+
+
+def parse_fields(fields: str) -> set[str]:
+    selected = {f.strip() for f in fields.split(",") if f.strip()}
+    if not selected or not selected <= set(DOCUMENT_FIELDS):
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"fields must be a comma-separated subset of {DOCUMENT_FIELDS}",
+        )
+    return selected
+
+
+def field_columns(selected: set[str]) -> list:
+    """Columns to select for a sparse fieldset.
+
+    ``content`` is the only large column; unless it is requested it is never
+    read from TOAST nor decoded.
+    """
+    columns = [getattr(Document, f) for f in DOCUMENT_FIELDS if f in selected]
+    if "content" in selected:
+        columns.append(current_layer().label("layer"))
+    return columns
+
+
+def fields_row(row: Any, selected: set[str]) -> dict[str, Any]:
+    data = {f: getattr(row, f) for f in DOCUMENT_FIELDS if f in selected}
+    if "content" in selected and row.layer:
+        data["content"] = {**data["content"], **row.layer}
+    return data
+
+
+async def get_own_fields(
+    doc_id: uuid.UUID,
+    owner_id: uuid.UUID,
+    selected: set[str],
+    session: AsyncSession,
+) -> tuple[dict[str, Any], str]:
+    result = await session.execute(
+        select(
+            *field_columns(selected | {"owner_id", "version"}),
+            current_layer_version(),
+        ).where(Document.id == doc_id)
+    )
+    row = result.one_or_none()
+    if not row:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Document not found"
+        )
+    if row.owner_id != owner_id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN, detail="Access denied"
+        )
+    return fields_row(row, selected), make_etag(row.version, row.layer_version)
+
+
+def encode_cursor(created_at: datetime, doc_id: uuid.UUID) -> str:
+    raw = json.dumps([created_at.isoformat(), str(doc_id)]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, uuid.UUID]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, doc_id = json.loads(raw)
+        return datetime.fromisoformat(created_at), uuid.UUID(doc_id)
+    except (binascii.Error, ValueError, TypeError) as e:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail="Invalid cursor"
+        ) from e
+
+
+async def estimate_owned(owner_id: uuid.UUID, session: AsyncSession) -> int:
+    """Planner estimate of the number of documents of ``owner_id``.
+
+    Costs no table scan, but is only as accurate as the table statistics.
+    """
+    plan = await session.scalar(
+        text("EXPLAIN (FORMAT JSON) SELECT 1 FROM documents WHERE owner_id = :owner"),
+        {"owner": owner_id},
+    )
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+async def export_own_docs(
+    owner_id: uuid.UUID,
+    selected: set[str],
+    doc_type: str | None = None,
+    updated_since: datetime | None = None,
+) -> AsyncIterator[bytes]:
+    """Stream owned documents as NDJSON lines, oldest first.
+
+    Opens its own session, because the response outlives the request-scoped
+    one. Rows are read through a server-side cursor in ``DOCS_EXPORT_BATCH_SIZE``
+    chunks inside a single read-only ``REPEATABLE READ`` transaction, so the
+    export is a consistent snapshot and memory use does not grow with the
+    number of documents.
+    """
+    query = (
+        select(*field_columns(selected))
+        .where(Document.owner_id == owner_id)
+        .order_by(Document.created_at, Document.id)
+        .execution_options(yield_per=settings.DOCS_EXPORT_BATCH_SIZE)
+    )
+    if doc_type is not None:
+        query = query.where(Document.doc_type == doc_type)
+    if updated_since is not None:
+        query = query.where(Document.updated_at >= updated_since)
+
+    async with async_session() as session:
+        await session.connection(
+            execution_options={
+                "isolation_level": "REPEATABLE READ",
+                "postgresql_readonly": True,
+            }
+        )
+        result = await session.stream(query)
+        async for partition in result.partitions():
+            yield b"".join(
+                DocumentFieldsOut(**fields_row(row, selected))
+                .model_dump_json(exclude_unset=True)
+                .encode()
+                + b"\n"
+                for row in partition
+            )
+
+
+_IMPORT_COLUMNS = ("id", "title", "doc_type", "content", "owner_id")
+
+
+async def _copy_documents(session: AsyncSession, records: list[tuple]) -> None:
+    """Write ``records`` (in ``_IMPORT_COLUMNS`` order) with ``COPY`` and commit."""
+    conn = await session.connection()
+    raw = await conn.get_raw_connection()
+    await raw.driver_connection.copy_records_to_table(
+        Document.__tablename__, records=records, columns=_IMPORT_COLUMNS
+    )
+    await session.commit()
+
+
+async def import_own_docs(
+    chunks: AsyncIterable[bytes],
+    owner_id: uuid.UUID,
+    session: AsyncSession,
+) -> DocumentImportOut:
+    """Import NDJSON documents from a byte stream.
+
+    Each line is validated like a ``POST /docs`` body. Valid documents are
+    written with ``COPY`` and committed every ``DOCS_IMPORT_BATCH_SIZE`` rows,
+    so neither the upload nor the rows are ever held in memory in full. The
+    first ``DOCS_IMPORT_MAX_ERRORS`` invalid lines are reported by number.
+
+    Batches are not rolled back if the stream turns out to be corrupt: the
+    400 raised then carries the summary up to that point, so the client
+    knows how many rows (``imported``) were committed before the failure.
+    """
+    summary = DocumentImportOut(lines=0, imported=0, failed=0, errors=[])
+    batch = []
+
+    def reject(line: int, detail: Any) -> None:
+        summary.failed += 1
+        if len(summary.errors) < settings.DOCS_IMPORT_MAX_ERRORS:
+            summary.errors.append(
+                BatchItemError(
+                    line=line,
+                    status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                    detail=detail,
+                )
+            )
+
+    lines = iter_lines(chunks, settings.DOCS_IMPORT_MAX_LINE_BYTES)
+    try:
+        async for number, line in lines:
+            summary.lines += 1
+            if line is None:
+                reject(
+                    number,
+                    f"Line exceeds {settings.DOCS_IMPORT_MAX_LINE_BYTES} bytes",
+                )
+                continue
+            try:
+                body = DocumentCreate.model_validate_json(line)
+            except ValidationError as e:
+                reject(number, e.errors(include_url=False, include_context=False))
+                continue
+
+            batch.append(
+                (
+                    uuid.uuid4(),
+                    body.title,
+                    body.doc_type,
+                    json.dumps(body.content),
+                    owner_id,
+                )
+            )
+            if len(batch) >= settings.DOCS_IMPORT_BATCH_SIZE:
+                await _copy_documents(session, batch)
+                summary.imported += len(batch)
+                batch.clear()
+    except zlib.error as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail={
+                "message": "Request body is not valid gzip.",
+                **summary.model_dump(mode="json"),
+            },
+        ) from e
+
+    if batch:
+        await _copy_documents(session, batch)
+        summary.imported += len(batch)
+    return summary
+
+
+def _split_path(path: str) -> list[str]:
+    return path.strip("/").split("/")
+
+
+def _is_index(key: str) -> bool:
+    try:
+        int(key)
+    except ValueError:
+        return False
+    return True
+
+
+def _at(node, keys: list[str]):
+    return node.op("#>", return_type=JSONB)(literal(keys, ARRAY(Text)))
+
+
+def _is_object(node):
+    return func.jsonb_typeof(node) == "object"
+
+
+def _layered_base(first_key: str):
+    """Node to follow a path starting at ``first_key`` in overlaid content.
+
+    The overlay is a root merge, so the first key alone decides whether the
+    path lives in the sync layer or in the stored content, and the content
+    does not have to be copied to resolve it.
+    """
+    return case((_synced(first_key), current_layer()), else_=Document.content)
+
+
+def _synced(first_key: str):
+    """Condition that the current sync layer sets the root key ``first_key``."""
+    return func.coalesce(
+        current_layer().op("?", return_type=Boolean)(first_key), False
+    )
+
+
+def _layered_content():
+    """Full overlaid content, as written back by path mutations."""
+    return Document.content.op("||", return_type=JSONB)(
+        func.coalesce(current_layer(), literal({}, JSONB))
+    )
+
+
+def _via_objects(base, keys: list[str]):
+    """Condition that following ``keys`` with ``#>`` only steps into objects.
+
+    ``#>`` also indexes into arrays when a key is an integer, so for such keys
+    the parent is additionally required to be an object. Other keys can only
+    be resolved in objects anyway.
+    """
+    cond = literal(True)
+    for i, key in enumerate(keys[1:], start=1):
+        if _is_index(key):
+            cond = cond & _is_object(_at(base, keys[:i]))
+    return cond
+
+
+async def _raise_for_miss(
+    doc_id: uuid.UUID,
+    owner_id: uuid.UUID,
+    session: AsyncSession,
+    if_match: str | None = None,
+    path: str | None = None,
+    write: bool = False,
+) -> None:
+    etag = await get_own_etag(doc_id, owner_id, session)
+    if if_match is not None and not etag_matches(if_match, etag):
+        raise HTTPException(
+            status_code=status.HTTP_412_PRECONDITION_FAILED,
+            detail="Document has been modified",
+            headers={"ETag": etag},
+        )
+    if write and await session.scalar(select(_synced(_split_path(path)[0]))):
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Path '{path}' is set by the sync layer and cannot be changed",
+        )
+    raise HTTPException(
+        status_code=status.HTTP_404_NOT_FOUND,
+        detail=f"Path '{path}' not found in document",
+    )
+
+
+async def update_own_doc(
+    doc_id: uuid.UUID,
+    owner_id: uuid.UUID,
+    values: dict[str, Any],
+    session: AsyncSession,
+    *where,
+    if_match: str | None = None,
+    path: str | None = None,
+) -> tuple[Document, str]:
+    """Apply ``values`` to an owned document with a single atomic UPDATE.
+
+    Bumps the document version and honours ``If-Match``. Returns the updated
+    document with the sync layer applied, and its new ETag.
+    """
+    result = await session.execute(
+        update(Document)
+        .where(
+            Document.id == doc_id,
+            Document.owner_id == owner_id,
+            _if_match(if_match),
+            *where,
+        )
+        .values(**values, version=Document.version + 1)
+        .returning(Document, current_layer(), current_layer_version())
+        .execution_options(synchronize_session=False)
+    )
+    row = result.one_or_none()
+    if row is None:
+        await session.rollback()
+        await _raise_for_miss(
+            doc_id, owner_id, session, if_match, path, write=path is not None
+        )
+    await session.commit()
+    doc, layer, layer_version = row
+    return apply_layer(doc, layer), make_etag(doc.version, layer_version)
+
+
+async def patch_own_doc(
+    doc_id: uuid.UUID,
+    owner_id: uuid.UUID,
+    change: Callable[[dict[str, Any]], dict[str, Any]],
+    session: AsyncSession,
+    if_match: str | None = None,
+) -> tuple[Document, str]:
+    """Replace the content of an owned document by ``change(content)`` atomically.
+
+    The overlaid content is read with the row locked, ``change`` computes the
+    new content in Python (raising ``HTTPException`` to abort) and the result
+    is written with one UPDATE, so any edit costs the same two statements and
+    one commit.
+    """
+    result = await session.execute(
+        select(
+            Document.owner_id,
+            Document.version,
+            _layered_content().label("content"),
+            current_layer_version(),
+        )
+        .where(Document.id == doc_id)
+        .with_for_update(of=Document)
+    )
+    row = result.one_or_none()
+    try:
+        if not row:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND, detail="Document not found"
+            )
+        if row.owner_id != owner_id:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN, detail="Access denied"
+            )
+        etag = make_etag(row.version, row.layer_version)
+        if if_match is not None and not etag_matches(if_match, etag):
+            raise HTTPException(
+                status_code=status.HTTP_412_PRECONDITION_FAILED,
+                detail="Document has been modified",
+                headers={"ETag": etag},
+            )
+        content = change(row.content)
+    except HTTPException:
+        await session.rollback()
+        raise
+    return await update_own_doc(doc_id, owner_id, {"content": content}, session)
+
+
+async def get_own_path(
+    doc_id: uuid.UUID,
+    owner_id: uuid.UUID,
+    path: str,
+    session: AsyncSession,
+) -> tuple[Any, str]:
+    """Resolve ``path`` inside a document in PostgreSQL.
+
+    Only the requested subtree is transferred, with the semantics of
+    :func:`resolve_path`. Returns the subtree and the document ETag.
+    """
+    keys = _split_path(path)
+    base = _layered_base(keys[0])
+    found = _via_objects(base, keys) & (Document.owner_id == owner_id)
+    value = case((found, cast(_at(base, keys), Text))).label("value")
+
+    result = await session.execute(
+        select(Document.version, value, current_layer_version()).where(
+            Document.id == doc_id
+        )
+    )
+    row = result.one_or_none()
+    if not row or row.value is None:
+        await _raise_for_miss(doc_id, owner_id, session, path=path)
+    return json.loads(row.value), make_etag(row.version, row.layer_version)
+
+
+async def set_own_path(
+    doc_id: uuid.UUID,
+    owner_id: uuid.UUID,
+    path: str,
+    value: Any,
+    session: AsyncSession,
+    if_match: str | None = None,
+) -> tuple[Document, str]:
+    """Set ``path`` inside a document with a single atomic UPDATE.
+
+    The deepest prefix of the path that resolves to objects is kept and
+    everything below it is replaced by nested objects ending in ``value``.
+    The new content is computed from the locked row, so
+    concurrent edits of different keys do not overwrite each other.
+
+    Paths under a root key set by the sync layer are a 409: the layer is
+    overlaid on read, so the write would never be visible.
+    """
+    keys = _split_path(path)
+    base = _layered_base(keys[0])
+    content = _layered_content()
+
+    def set_at(depth: int):
+        node = value
+        for key in reversed(keys[depth + 1 :]):
+            node = {key: node}
+        return func.jsonb_set(
+            content, literal(keys[: depth + 1], ARRAY(Text)), literal(node, JSONB)
+        )
+
+    # Deepest prefix first: the first one resolving to an object wins.
+    whens = []
+    for depth in range(len(keys) - 1, 0, -1):
+        prefix = keys[:depth]
+        whens.append(
+            (_is_object(_at(base, prefix)) & _via_objects(base, prefix), set_at(depth))
+        )
+    new_content = case(*whens, else_=set_at(0)) if whens else set_at(0)
+
+    return await update_own_doc(
+        doc_id,
+        owner_id,
+        {"content": new_content},
+        session,
+        ~_synced(keys[0]),
+        if_match=if_match,
+        path=path,
+    )
+
+
+async def delete_own_path(
+    doc_id: uuid.UUID,
+    owner_id: uuid.UUID,
+    path: str,
+    session: AsyncSession,
+    if_match: str | None = None,
+) -> tuple[Document, str]:
+    """Delete ``path`` inside a document with a single atomic UPDATE.
+
+    Keys are only looked up in objects, and a missing path is a 404. Paths
+    under a root key set by the sync layer are a 409, as for
+    :func:`set_own_path`.
+    """
+    keys = _split_path(path)
+    base = _layered_base(keys[0])
+    exists = _via_objects(base, keys) & _at(base, keys).is_not(None)
+    if len(keys) > 1:
+        exists = exists & _is_object(_at(base, keys[:-1]))
+
+    content = _layered_content().op("#-", return_type=JSONB)(literal(keys, ARRAY(Text)))
+    return await update_own_doc(
+        doc_id,
+        owner_id,
+        {"content": content},
+        session,
+        exists,
+        ~_synced(keys[0]),
+        if_match=if_match,
+        path=path,
+    )
+
+
 def resolve_path(content: dict, path: str) -> Any:
-    keys = path.strip("/").split("/")
+    keys = _split_path(path)
     node: Any = content
     for key in keys:
         if not isinstance(node, dict) or key not in node:
@@ -40,58 +798,384 @@ def resolve_path(content: dict, path: str) -> Any:
     return node
 
 
-def set_path(content: dict, path: str, value: Any) -> None:
-    keys = path.strip("/").split("/")
-    node = content
-    for key in keys[:-1]:
-        if key not in node or not isinstance(node[key], dict):
-            node[key] = {}
-        node = node[key]
-    node[keys[-1]] = value
+def copy_along(content: Any, keys: list) -> tuple[Any, Any]:
+    """Copy-on-write access to the container at ``keys`` inside ``content``.
 
+    Only the root and the containers along ``keys`` (existing dict keys or
+    list positions) are shallow-copied; every other subtree is shared with
+    ``content``, which is left untouched. Returns the new root and its own
+    copy of the container at ``keys``, which the caller may mutate.
+    """
+    root = node = content.copy()
+    for key in keys:
+        child = node[key].copy()
+        node[key] = child
+        node = child
+    return root, node
 
-def delete_path(content: dict, path: str) -> None:
-    keys = path.strip("/").split("/")
-    node = content
-    for key in keys[:-1]:
-        if not isinstance(node, dict) or key not in node:
+
+# Serialized diffs keyed by both documents' ids and ETags plus the diff
+# options; any write or new sync layer changes an ETag, so stale entries are
+# never hit again and simply age out.
+diff_cache: LRUCache[tuple, bytes] = LRUCache(
+    maxsize=settings.DIFF_CACHE_MAX_SIZE, max_weight=settings.DIFF_CACHE_MAX_BYTES
+)
+
+
+def _check_owned(rows: dict[uuid.UUID, Any], ids: tuple, owner_id: uuid.UUID) -> None:
+    for doc_id in ids:
+        row = rows.get(doc_id)
+        if row is None:
             raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail=f"Path '{path}' not found in document",
+                status_code=status.HTTP_404_NOT_FOUND, detail="Document not found"
             )
-        node = node[key]
-    if keys[-1] not in node:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Path '{path}' not found in document",
+        if row.owner_id != owner_id:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN, detail="Access denied"
+            )
+
+
+async def diff_own_docs(
+    a: uuid.UUID,
+    b: uuid.UUID,
+    owner_id: uuid.UUID,
+    session: AsyncSession,
+    **options: Any,
+) -> bytes:
+    """Diff two owned documents and return the serialized ``DocumentDiff``.
+
+    Versions are looked up first without reading content; on a cache hit that
+    is the only query. On a miss both documents are loaded with one query and
+    the result is cached under the versions it was computed from.
+    """
+    ids = (a, b)
+    option_key = tuple(sorted(options.items()))
+    result = await session.execute(
+        select(
+            Document.id,
+            Document.owner_id,
+            Document.version,
+            current_layer_version(),
+        ).where(Document.id.in_(ids))
+    )
+    rows = {row.id: row for row in result}
+    _check_owned(rows, ids, owner_id)
+    key = (*((i, rows[i].version, rows[i].layer_version) for i in ids), option_key)
+    cached = diff_cache.get(key)
+    if cached is not None:
+        return cached
+
+    result = await session.execute(
+        select(
+            Document.id,
+            Document.owner_id,
+            Document.version,
+            Document.content,
+            current_layer().label("layer"),
+            current_layer_version(),
+        ).where(Document.id.in_(ids))
+    )
+    rows = {row.id: row for row in result}
+    _check_owned(rows, ids, owner_id)
+    content = {i: {**r.content, **(r.layer or {})} for i, r in rows.items()}
+    body = diff(content[a], content[b], **options).model_dump_json().encode()
+    key = (*((i, rows[i].version, rows[i].layer_version) for i in ids), option_key)
+    diff_cache.set(key, body, len(body))
+    return body
+
+
+@functools.cache
+def diff_pool() -> ProcessPoolExecutor | None:
+    """Process pool for CPU-bound diffs, started on first use.
+
+    Returns ``None`` when ``DIFF_WORKERS`` is 0; diffs then run in the default
+    thread pool, which keeps the event loop free but shares the GIL.
+    """
+    if settings.DIFF_WORKERS <= 0:
+        return None
+    return ProcessPoolExecutor(
+        max_workers=settings.DIFF_WORKERS,
+        mp_context=multiprocessing.get_context("spawn"),
+    )
+
+
+def shutdown_diff_pool() -> None:
+    if diff_pool.cache_info().currsize:
+        pool = diff_pool()
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+        diff_pool.cache_clear()
+
+
+def _replace_broken_pool(pool: ProcessPoolExecutor) -> None:
+    """Drop ``pool`` after a worker died, so the next use starts a new one.
+
+    A ``ProcessPoolExecutor`` whose worker was killed (OOM, segfault) fails
+    every later submission with ``BrokenProcessPool``.
+    """
+    if diff_pool.cache_info().currsize and diff_pool() is pool:
+        diff_pool.cache_clear()
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _submit_diffs(
+    base: dict[str, Any], chunks: list[list], options: dict
+) -> tuple[ProcessPoolExecutor | None, dict[asyncio.Future, list]]:
+    """Start diffing each chunk of targets in ``diff_pool``.
+
+    Returns the pool used and the futures mapped to their chunks. Raises
+    ``BrokenProcessPool``, with nothing left running, if the pool is broken.
+    """
+    loop = asyncio.get_running_loop()
+    pool = diff_pool()
+    futures: dict[asyncio.Future, list] = {}
+    try:
+        for chunk in chunks:
+            future = loop.run_in_executor(pool, _diff_chunk, base, chunk, options)
+            futures[future] = chunk
+    except BrokenProcessPool:
+        for future in futures:
+            future.cancel()
+        _replace_broken_pool(pool)
+        raise
+    return pool, futures
+
+
+def _diff_chunk(
+    base: dict[str, Any], targets: list[tuple[str, dict[str, Any]]], options: dict
+) -> list[bytes]:
+    """Diff ``base`` against each target; runs in a pool worker."""
+    return [
+        b'{"target":"%s","diff":%s}\n'
+        % (
+            target_id.encode(),
+            diff(base, content, **options).model_dump_json().encode(),
         )
-    del node[keys[-1]]
+        for target_id, content in targets
+    ]
+
+
+async def diff_own_docs_many(
+    base: uuid.UUID,
+    targets: list[uuid.UUID],
+    owner_id: uuid.UUID,
+    session: AsyncSession,
+    **options: Any,
+) -> AsyncIterator[bytes]:
+    """Diff one owned document against many, as an iterator of NDJSON lines.
 
+    All documents are loaded with one query before the iterator is returned;
+    the base must be accessible, missing or foreign targets are
+    reported as per-target error lines. Diffs are computed in ``diff_pool``,
+    split into a few chunks per worker so the base is not pickled once per
+    target, and each chunk is yielded as soon as it completes.
+
+    A pool broken by a dead worker is replaced and the affected chunks are
+    retried once on the new pool. If the pool cannot take the work before
+    the response starts, this raises 503; chunks that still fail after the
+    retry are reported as per-target 503 error lines.
+    """
+    result = await session.execute(
+        select(
+            Document.id,
+            Document.owner_id,
+            Document.content,
+            current_layer().label("layer"),
+        ).where(Document.id.in_({base, *targets}))
+    )
+    rows = {row.id: row for row in result}
+    _check_owned(rows, (base,), owner_id)
+
+    def content(doc_id: uuid.UUID) -> dict[str, Any]:
+        row = rows[doc_id]
+        return {**row.content, **row.layer} if row.layer else row.content
+
+    errors, pending = [], []
+    for target in dict.fromkeys(targets):
+        row = rows.get(target)
+        if row is None or row.owner_id != owner_id:
+            error = BatchItemError(
+                id=str(target),
+                status_code=(
+                    status.HTTP_404_NOT_FOUND
+                    if row is None
+                    else status.HTTP_403_FORBIDDEN
+                ),
+                detail="Document not found" if row is None else "Access denied",
+            )
+            errors.append(error.model_dump_json(exclude_none=True).encode() + b"\n")
+        else:
+            pending.append((str(target), content(target)))
+    base_content = content(base)
+
+    chunks = []
+    if pending:
+        size = -(-len(pending) // (max(1, settings.DIFF_WORKERS) * 4))
+        chunks = [pending[i : i + size] for i in range(0, len(pending), size)]
+    # Submitted before the response starts, so a broken pool can still be
+    # answered with a 503.
+    try:
+        pool, running = _submit_diffs(base_content, chunks, options)
+    except BrokenProcessPool:
+        try:
+            pool, running = _submit_diffs(base_content, chunks, options)
+        except BrokenProcessPool as e:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Diff workers are unavailable, retry later.",
+            ) from e
+
+    async def generate() -> AsyncIterator[bytes]:
+        nonlocal pool, running
+        for line in errors:
+            yield line
+        failed: list[list] = []
+        try:
+            for last_attempt in (False, True):
+                failed = []
+                while running:
+                    done, _ = await asyncio.wait(
+                        running, return_when=asyncio.FIRST_COMPLETED
+                    )
+                    for future in done:
+                        chunk = running.pop(future)
+                        try:
+                            lines = future.result()
+                        except BrokenProcessPool:
+                            failed.append(chunk)
+                            continue
+                        yield b"".join(lines)
+                if not failed:
+                    return
+                _replace_broken_pool(pool)
+                if last_attempt:
+                    break
+                try:
+                    pool, running = _submit_diffs(base_content, failed, options)
+                except BrokenProcessPool:
+                    break
+        finally:
+            for future in running:
+                future.cancel()
+        for chunk in failed:
+            for target_id, _ in chunk:
+                error = BatchItemError(
+                    id=target_id,
+                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    detail="Diff worker crashed",
+                )
+                yield error.model_dump_json(exclude_none=True).encode() + b"\n"
+
+    return generate()
+
+
+def _identity_index(items: list, key: str) -> dict[Any, int] | None:
+    """Map identity value to position, or ``None`` if ``items`` lack a unique key."""
+    index = {}
+    for position, item in enumerate(items):
+        if not isinstance(item, dict) or key not in item:
+            return None
+        identity = item[key]
+        if isinstance(identity, (dict, list)) or identity in index:
+            return None
+        index[identity] = position
+    return index
+
+
+def _children(old: Any, new: Any, list_key: str | None) -> tuple[Any, list, list]:
+    """Split two containers into common, removed and added children.
+
+    Returns ``(pairs, removed, added)`` where ``pairs`` lazily yields
+    ``(key, old value, new value)`` and the others hold ``(key, value)``.
+    Lists are aligned by the ``list_key`` of their items when every item has a
+    unique one, otherwise by index; their keys are positions in the list
+    holding the value (the new list for common items).
+    """
+    if isinstance(old, dict):
+        pairs = ((k, v, new[k]) for k, v in old.items() if k in new)
+        removed = [(k, v) for k, v in old.items() if k not in new]
+        added = [(k, v) for k, v in new.items() if k not in old]
+        return pairs, removed, added
+
+    old_index = new_index = None
+    if list_key is not None:
+        old_index = _identity_index(old, list_key)
+    if old_index is not None:
+        new_index = _identity_index(new, list_key)
+    if new_index is not None:
+        pairs = (
+            (j, old[old_index[identity]], new[j])
+            for identity, j in new_index.items()
+            if identity in old_index
+        )
+        removed = [
+            (i, old[i])
+            for identity, i in old_index.items()
+            if identity not in new_index
+        ]
+        added = [
+            (j, new[j])
+            for identity, j in new_index.items()
+            if identity not in old_index
+        ]
+        return pairs, removed, added
 
-def diff(a: dict[str, Any], b: dict[str, Any], prefix: str = "") -> DocumentDiff:
-    added: dict[str, Any] = {}
-    removed: dict[str, Any] = {}
-    changed: dict[str, DiffValue] = {}
+    common = min(len(old), len(new))
+    pairs = zip(range(common), old, new)
+    removed = list(enumerate(old[common:], common))
+    added = list(enumerate(new[common:], common))
+    return pairs, removed, added
 
-    def full_key(key: str) -> str:
-        return f"{prefix}{key}" if not prefix else f"{prefix}/{key}"
 
-    all_keys = a.keys() | b.keys()
+def diff(
+    a: dict[str, Any],
+    b: dict[str, Any],
+    list_key: str | None = None,
+    max_depth: int | None = None,
+    max_changes: int | None = None,
+) -> DocumentDiff:
+    """Compare two documents, descending into objects and lists.
 
-    for key in all_keys:
-        fk = full_key(key)
-        in_a, in_b = key in a, key in b
+    Walks both trees with an explicit stack, so nesting depth is not limited
+    by the interpreter's recursion limit. Equal subtrees are skipped with a
+    single C-level ``==`` before descending into them. Keys of the result are
+    ``/``-joined paths; list items are addressed by position and aligned by
+    ``list_key`` when given (see ``_children``).
 
-        if in_a and not in_b:
-            removed[fk] = a[key]
-        elif in_b and not in_a:
-            added[fk] = b[key]
-        elif isinstance(a[key], dict) and isinstance(b[key], dict):
-            nested = diff(a[key], b[key], prefix=fk)
-            added.update(nested.added)
-            removed.update(nested.removed)
-            changed.update(nested.changed)
-        elif a[key] != b[key]:
-            changed[fk] = DiffValue(old=a[key], new=b[key])
+    Subtrees deeper than ``max_depth`` are reported as a single change. Once
+    ``max_changes`` entries are collected the walk stops and the result is
+    marked as truncated.
+    """
+    result = DocumentDiff(added={}, removed={}, changed={})
+    count = 0
+    stack = [("", a, b, 0)]
+    while stack:
+        prefix, old, new, depth = stack.pop()
+        pairs, removed, added = _children(old, new, list_key)
+        entries = [(result.removed, k, v) for k, v in removed]
+        entries += [(result.added, k, v) for k, v in added]
+        nested = []
+        for key, old_value, new_value in pairs:
+            if old_value == new_value:
+                continue
+            if (
+                isinstance(old_value, (dict, list))
+                and type(old_value) is type(new_value)
+                and (max_depth is None or depth < max_depth)
+            ):
+                nested.append((key, old_value, new_value))
+            else:
+                entries.append(
+                    (result.changed, key, DiffValue(old=old_value, new=new_value))
+                )
 
-    return DocumentDiff(added=added, removed=removed, changed=changed)
+        for target, key, value in entries:
+            if max_changes is not None and count >= max_changes:
+                result.truncated = True
+                return result
+            target[f"{prefix}/{key}" if prefix else key] = value
+            count += 1
+        for key, old_value, new_value in reversed(nested):
+            path = f"{prefix}/{key}" if prefix else key
+            stack.append((path, old_value, new_value, depth + 1))
+    return result
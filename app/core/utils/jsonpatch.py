@@ -0,0 +1,153 @@
+"""RFC 6902 JSON Patch applied to document content.
+
+Paths are RFC 6901 JSON Pointers (``/a/b/0``, with ``~1`` for ``/`` and
+``~0`` for ``~``). Malformed operations are rejected with 422; operations
+that cannot be applied to the current content (missing targets, a failed
+``test``) with 409, as suggested by RFC 5789.
+"""
+
+from typing import Any
+
+from fastapi import HTTPException, status
+
+from app.core.schemas.document import JsonPatchOperation
+from app.core.utils.docs import copy_along
+
+
+def _unprocessable(detail: str) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=detail
+    )
+
+
+def _conflict(detail: str) -> HTTPException:
+    return HTTPException(status_code=status.HTTP_409_CONFLICT, detail=detail)
+
+
+def parse_pointer(pointer: str) -> list[str]:
+    if pointer == "":
+        return []
+    if not pointer.startswith("/"):
+        raise _unprocessable(f"Invalid JSON pointer '{pointer}'")
+    return [t.replace("~1", "/").replace("~0", "~") for t in pointer[1:].split("/")]
+
+
+def _index(node: list, token: str, pointer: str, allow_end: bool = False) -> int:
+    """Position addressed by ``token`` in ``node``; ``-`` means the end."""
+    if allow_end and token == "-":
+        return len(node)
+    # isdigit() alone also accepts non-ASCII digits such as "²".
+    if not (token.isascii() and token.isdigit()) or (
+        token != "0" and token.startswith("0")
+    ):
+        raise _conflict(f"Invalid array index '{token}' in '{pointer}'")
+    index = int(token)
+    if index > len(node) or (index == len(node) and not allow_end):
+        raise _conflict(f"Array index out of range in '{pointer}'")
+    return index
+
+
+def _child(node: Any, token: str, pointer: str) -> tuple[Any, Any]:
+    """Return the key addressing ``token`` in ``node`` and the value there."""
+    if isinstance(node, dict):
+        if token not in node:
+            raise _conflict(f"Path '{pointer}' not found in document")
+        return token, node[token]
+    if isinstance(node, list):
+        index = _index(node, token, pointer)
+        return index, node[index]
+    raise _conflict(f"Path '{pointer}' not found in document")
+
+
+def _locate(content: Any, tokens: list[str], pointer: str) -> tuple[list, Any]:
+    """Resolve ``tokens`` to dict keys and list positions, and the value there."""
+    keys, node = [], content
+    for token in tokens:
+        key, node = _child(node, token, pointer)
+        keys.append(key)
+    return keys, node
+
+
+def resolve(content: Any, tokens: list[str], pointer: str) -> Any:
+    return _locate(content, tokens, pointer)[1]
+
+
+def _parent(content: Any, tokens: list[str], pointer: str) -> tuple[Any, Any]:
+    """Copy-on-write the container holding the last token of ``tokens``."""
+    keys, parent = _locate(content, tokens[:-1], pointer)
+    if not isinstance(parent, (dict, list)):
+        raise _conflict(f"Path '{pointer}' not found in document")
+    return copy_along(content, keys)
+
+
+def _add(content: Any, tokens: list[str], value: Any, pointer: str) -> Any:
+    if not tokens:
+        return value
+    root, parent = _parent(content, tokens, pointer)
+    if isinstance(parent, dict):
+        parent[tokens[-1]] = value
+    else:
+        parent.insert(_index(parent, tokens[-1], pointer, allow_end=True), value)
+    return root
+
+
+def _remove(content: Any, tokens: list[str], pointer: str) -> tuple[Any, Any]:
+    """Return the content without ``tokens`` and the removed value."""
+    if not tokens:
+        raise _unprocessable("Cannot remove the document root")
+    root, parent = _parent(content, tokens, pointer)
+    key, _ = _child(parent, tokens[-1], pointer)
+    return root, parent.pop(key)
+
+
+def json_equal(a: Any, b: Any) -> bool:
+    """Equality of JSON values: like ``==``, except that booleans never equal
+    numbers."""
+    if isinstance(a, bool) or isinstance(b, bool):
+        return type(a) is type(b) and a == b
+    if isinstance(a, dict) and isinstance(b, dict):
+        return a.keys() == b.keys() and all(json_equal(a[k], b[k]) for k in a)
+    if isinstance(a, list) and isinstance(b, list):
+        return len(a) == len(b) and all(map(json_equal, a, b))
+    return a == b
+
+
+def apply_patch(
+    content: dict[str, Any], operations: list[JsonPatchOperation]
+) -> dict[str, Any]:
+    """Apply ``operations`` in order and return the new content.
+
+    ``content`` is never modified: every operation copies only the containers
+    along its path (see ``copy_along``) and shares the rest, so either all
+    operations apply or none do, and large documents are not copied whole.
+    """
+    result: Any = content
+    for op in operations:
+        tokens = parse_pointer(op.path)
+        if op.op == "add":
+            result = _add(result, tokens, op.value, op.path)
+        elif op.op == "remove":
+            result, _ = _remove(result, tokens, op.path)
+        elif op.op == "replace":
+            resolve(result, tokens, op.path)
+            if tokens:
+                result, _ = _remove(result, tokens, op.path)
+            result = _add(result, tokens, op.value, op.path)
+        elif op.op == "test":
+            if not json_equal(resolve(result, tokens, op.path), op.value):
+                raise _conflict(f"Test failed at '{op.path}'")
+        else:
+            source = parse_pointer(op.from_)
+            if op.op == "move":
+                if tokens[: len(source)] == source and tokens != source:
+                    raise _unprocessable(
+                        f"Cannot move '{op.from_}' into its own child '{op.path}'"
+                    )
+                result, value = _remove(result, source, op.from_)
+            else:
+                value = resolve(result, source, op.from_)
+            result = _add(result, tokens, value, op.path)
+
+    if not isinstance(result, dict):
+        raise _unprocessable("Document content must remain a JSON object")
+    return result
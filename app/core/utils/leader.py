@@ -0,0 +1,126 @@
+"""Cluster-wide leader election for the sync task via PostgreSQL advisory locks.
+
+The leader holds a session-level advisory lock on a dedicated connection for
+as long as it runs the sync. If the process dies, PostgreSQL closes its
+backend and releases the lock, so a standby polling the lock takes over.
+"""
+
+import logging
+import os
+from typing import Any
+
+from sqlalchemy import func, select, text
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncSession
+
+from app.core.config import settings
+
+logger = logging.getLogger(settings.PROJECT_NAME)
+
+# Two-key form of the advisory lock: (namespace, lock id).
+SYNC_LOCK_NAMESPACE = 0x524F59
+SYNC_LOCK_ID = 1
+
+# Server-side TCP keepalives on the lock connection, so a leader whose host
+# vanished without closing the socket loses the lock in ~25 s.
+_KEEPALIVES = {
+    "tcp_keepalives_idle": "10",
+    "tcp_keepalives_interval": "5",
+    "tcp_keepalives_count": "3",
+}
+
+
+# PostgreSQL keeps only the first NAMEDATALEN - 1 bytes of application_name.
+_APPLICATION_NAME_BYTES = 63
+
+# Backend pid of the connection holding the sync lock in this process.
+_lock_backend_pid: int | None = None
+
+
+def instance_name() -> str:
+    """Identity of this process as reported to operators.
+
+    Clipped, keeping the pid, to what fits in ``application_name``.
+    """
+    pid = f":{os.getpid()}"
+    prefix = f"{settings.PROJECT_NAME}-sync:{settings.HOST_ID}:{settings.INSTANCE_ID}"
+    prefix = prefix.encode()[: _APPLICATION_NAME_BYTES - len(pid)]
+    return prefix.decode(errors="ignore") + pid
+
+
+def is_leader(leader: dict[str, Any] | None) -> bool:
+    """Whether ``leader`` (see :func:`current_leader`) is this process.
+
+    Compared by backend pid: ``application_name`` can be altered by the
+    server (truncated, non-ASCII replaced), so it only serves operators.
+    """
+    return leader is not None and leader["backend_pid"] == _lock_backend_pid
+
+
+async def _reset_session(conn: AsyncConnection) -> None:
+    """Undo the session settings made by :func:`acquire_leadership`.
+
+    They are session-level, so without this they would stick to the pooled
+    connection and to every request that later checks it out.
+    """
+    for name in ("application_name", *_KEEPALIVES):
+        await conn.execute(text(f"RESET {name}"))
+    await conn.commit()
+
+
+async def acquire_leadership(conn: AsyncConnection) -> bool:
+    """Try to take the sync lock on ``conn`` without waiting."""
+    for name, value in {"application_name": instance_name(), **_KEEPALIVES}.items():
+        await conn.execute(select(func.set_config(name, value, False)))
+    global _lock_backend_pid
+    acquired, backend_pid = (
+        await conn.execute(
+            select(
+                func.pg_try_advisory_lock(SYNC_LOCK_NAMESPACE, SYNC_LOCK_ID),
+                func.pg_backend_pid(),
+            )
+        )
+    ).one()
+    await conn.commit()
+    if not acquired:
+        await _reset_session(conn)
+        return False
+    _lock_backend_pid = backend_pid
+    return True
+
+
+async def release_leadership(conn: AsyncConnection) -> None:
+    """Release the sync lock, dropping the connection if that fails."""
+    global _lock_backend_pid
+    _lock_backend_pid = None
+    try:
+        await conn.execute(
+            select(func.pg_advisory_unlock(SYNC_LOCK_NAMESPACE, SYNC_LOCK_ID))
+        )
+        await conn.commit()
+        await _reset_session(conn)
+    except Exception:  # pylint: disable=broad-exception-caught
+        # A connection that may still hold the lock must never go back to
+        # the pool.
+        await conn.invalidate()
+
+
+async def current_leader(session: AsyncSession) -> dict[str, Any] | None:
+    """Return the backend currently holding the sync lock, if any."""
+    result = await session.execute(
+        text(
+            "SELECT a.pid, a.application_name, a.client_addr, a.backend_start "
+            "FROM pg_locks l JOIN pg_stat_activity a ON a.pid = l.pid "
+            "WHERE l.locktype = 'advisory' AND l.granted "
+            "AND l.classid = :namespace AND l.objid = :lock_id AND l.objsubid = 2"
+        ),
+        {"namespace": SYNC_LOCK_NAMESPACE, "lock_id": SYNC_LOCK_ID},
+    )
+    row = result.one_or_none()
+    if row is None:
+        return None
+    return {
+        "instance": row.application_name,
+        "backend_pid": row.pid,
+        "client_addr": str(row.client_addr) if row.client_addr else None,
+        "since": row.backend_start,
+    }
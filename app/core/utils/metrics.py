@@ -0,0 +1,388 @@
+"""Metrics exposed in the Prometheus text format.
+
+Counters, histograms and gauges are plain Python objects updated from the
+event loop without locks; an update is a dict lookup and a few additions,
+cheap enough to leave on in production.
+
+With several workers behind one port (``UVICORN_WORKERS > 1``) a scrape
+reaches an arbitrary worker, so every worker also writes a snapshot of its
+values to ``METRICS_DIR`` every ``METRICS_FLUSH_SECONDS`` and ``/metrics``
+merges the snapshots of all workers: counters and histograms are summed over
+every worker that ever ran (so totals stay monotonic across restarts), gauges
+over the live ones. Other workers' values lag by at most one flush interval.
+"""
+
+import asyncio
+import bisect
+import json
+import logging
+import math
+import os
+import time
+from pathlib import Path
+from typing import Any, Callable, Iterator
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from app.core.config import settings
+
+logger = logging.getLogger(settings.PROJECT_NAME)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)  # fmt: skip
+SIZE_BUCKETS = tuple(float(4**i) * 256 for i in range(10))  # 256 B … 64 MiB
+
+# Per metric: label values -> value (a number, or bucket counts plus sum).
+Values = dict[tuple[str, ...], Any]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", r"\\").replace("\n", r"\n").replace('"', r"\"")
+
+
+def _labels(names: tuple[str, ...], values: tuple[str, ...], **extra: str) -> str:
+    pairs = [*zip(names, values), *extra.items()]
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{n}="{_escape(str(v))}"' for n, v in pairs) + "}"
+
+
+def _number(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _add(a: Any, b: Any) -> Any:
+    if isinstance(a, list):
+        return [x + y for x, y in zip(a, b)]
+    return a + b
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class Registry:
+    """Collection of metrics rendered together by :meth:`render`."""
+
+    def __init__(self) -> None:
+        self._metrics: list[Any] = []
+
+    def register(self, metric: Any) -> None:
+        self._metrics.append(metric)
+
+    def snapshot(self) -> dict[str, Values]:
+        return {metric.name: metric.values() for metric in self._metrics}
+
+    def flush(self, directory: str) -> None:
+        """Atomically write this process's values to ``directory``."""
+        data = {
+            name: [[list(labels), value] for labels, value in values.items()]
+            for name, values in self.snapshot().items()
+        }
+        path = Path(directory) / f"{os.getpid()}.json"
+        tmp = path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(data), encoding="utf-8")
+        os.replace(tmp, path)
+
+    def _merged(self, directory: str) -> dict[str, Values]:
+        """Own live values plus the last snapshot of every other worker."""
+        merged = self.snapshot()
+        kinds = {metric.name: metric.kind for metric in self._metrics}
+        for path in Path(directory).glob("*.json"):
+            pid = int(path.stem)
+            if pid == os.getpid():
+                continue
+            try:
+                data = json.loads(path.read_text(encoding="utf-8"))
+            except (OSError, ValueError):
+                continue
+            alive = _pid_alive(pid)
+            for name, items in data.items():
+                if name not in merged or (kinds[name] == "gauge" and not alive):
+                    continue
+                values = merged[name]
+                for labels, value in items:
+                    key = tuple(labels)
+                    values[key] = _add(values[key], value) if key in values else value
+        return merged
+
+    def render(self) -> str:
+        if settings.METRICS_DIR:
+            values = self._merged(settings.METRICS_DIR)
+        else:
+            values = self.snapshot()
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples(values[metric.name]))
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+def reset_dir(directory: str) -> None:
+    """Create ``directory`` and drop snapshots left by a previous run."""
+    Path(directory).mkdir(parents=True, exist_ok=True)
+    for path in Path(directory).glob("*.json"):
+        path.unlink(missing_ok=True)
+
+
+async def flush_loop() -> None:
+    """Write this worker's snapshot to ``METRICS_DIR`` periodically."""
+    while True:
+        await asyncio.sleep(settings.METRICS_FLUSH_SECONDS)
+        try:
+            REGISTRY.flush(settings.METRICS_DIR)
+        except OSError:
+            logger.exception("Could not write metrics snapshot.")
+
+
+class Counter:
+    """Monotonic counter, optionally split by labels."""
+
+    kind = "counter"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple[str, ...] = (),
+        registry: Registry = REGISTRY,
+    ) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._values: dict[tuple[str, ...], float] = {}
+        registry.register(self)
+
+    def inc(self, *labelvalues: str, amount: float = 1) -> None:
+        self._values[labelvalues] = self._values.get(labelvalues, 0) + amount
+
+    def values(self) -> Values:
+        return dict(self._values)
+
+    def samples(self, values: Values) -> Iterator[str]:
+        for labels, total in values.items():
+            yield f"{self.name}{_labels(self.labelnames, labels)} {_number(total)}"
+
+
+class Gauge:
+    """Value read from ``func`` at scrape time, summed over live workers."""
+
+    kind = "gauge"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        func: Callable[[], float | None],
+        registry: Registry = REGISTRY,
+    ) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.func = func
+        registry.register(self)
+
+    def values(self) -> Values:
+        value = self.func()
+        return {} if value is None else {(): value}
+
+    def samples(self, values: Values) -> Iterator[str]:
+        for value in values.values():
+            yield f"{self.name} {_number(value)}"
+
+
+class Histogram:
+    """Distribution of observed values over fixed upper bounds."""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = LATENCY_BUCKETS,
+        registry: Registry = REGISTRY,
+    ) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: count per bucket (the last one is +Inf), then sum.
+        self._values: dict[tuple[str, ...], list[float]] = {}
+        registry.register(self)
+
+    def observe(self, value: float, *labelvalues: str) -> None:
+        counts = self._values.get(labelvalues)
+        if counts is None:
+            counts = self._values[labelvalues] = [0] * (len(self.buckets) + 2)
+        counts[bisect.bisect_left(self.buckets, value)] += 1
+        counts[-1] += value
+
+    def values(self) -> Values:
+        return {labels: list(counts) for labels, counts in self._values.items()}
+
+    def samples(self, values: Values) -> Iterator[str]:
+        for labels, counts in values.items():
+            cumulative = 0
+            for bound, count in zip((*self.buckets, math.inf), counts):
+                cumulative += count
+                le = _labels(self.labelnames, labels, le=_number(bound))
+                yield f"{self.name}_bucket{le} {_number(cumulative)}"
+            base = _labels(self.labelnames, labels)
+            yield f"{self.name}_sum{base} {_number(counts[-1])}"
+            yield f"{self.name}_count{base} {_number(cumulative)}"
+
+
+Gauge(
+    "royaldocs_workers",
+    "Live worker processes whose metrics are included.",
+    lambda: 1,
+)
+
+REQUEST_DURATION = Histogram(
+    "royaldocs_http_request_duration_seconds",
+    "Time to handle an HTTP request, until the response is fully sent.",
+    ("method", "route", "status"),
+)
+DB_QUERY_DURATION = Histogram(
+    "royaldocs_db_query_duration_seconds",
+    "Time to execute a single SQL statement.",
+)
+DB_POOL_WAIT = Histogram(
+    "royaldocs_db_pool_checkout_wait_seconds",
+    "Time spent waiting for a connection from the pool.",
+)
+SYNC_DURATION = Histogram(
+    "royaldocs_sync_duration_seconds",
+    "Duration of a sync pass (run_sync_once).",
+    buckets=(0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0),
+)
+SYNC_ROWS_MERGED = Counter(
+    "royaldocs_sync_documents_merged_total",
+    "Documents whose stored content was changed by the sync.",
+)
+SYNC_SKIPPED = Counter(
+    "royaldocs_sync_skipped_total",
+    "Sync passes that did not write anything, by reason.",
+    ("reason",),
+)
+SYNC_FAILURES = Counter(
+    "royaldocs_sync_failures_total",
+    "Sync passes that raised an error.",
+)
+DOCUMENT_SIZE = Histogram(
+    "royaldocs_document_size_bytes",
+    "Serialized size of single documents returned or written by the API.",
+    buckets=SIZE_BUCKETS,
+)
+
+
+class TimedQueuePool(AsyncAdaptedQueuePool):
+    """Async queue pool reporting how long checkouts wait for a connection."""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            DB_POOL_WAIT.observe(time.perf_counter() - start)
+
+
+def instrument_engine(engine: AsyncEngine) -> None:
+    """Time every statement of ``engine`` and export its pool occupancy.
+
+    ``engine`` must use :class:`TimedQueuePool`.
+    """
+    sync_engine = engine.sync_engine
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _start(conn, cursor, statement, parameters, context, executemany):
+        # pylint: disable=unused-argument,too-many-arguments
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _stop(conn, cursor, statement, parameters, context, executemany):
+        # pylint: disable=unused-argument,too-many-arguments
+        start = conn.info["query_start"].pop()
+        DB_QUERY_DURATION.observe(time.perf_counter() - start)
+
+    @event.listens_for(sync_engine, "handle_error")
+    def _error(context):
+        if context.connection is None:
+            return
+        starts = context.connection.info.get("query_start")
+        if starts:
+            DB_QUERY_DURATION.observe(time.perf_counter() - starts.pop())
+
+    pool = sync_engine.pool
+    Gauge(
+        "royaldocs_db_pool_size",
+        "Configured size of the connection pool.",
+        pool.size,
+    )
+    Gauge(
+        "royaldocs_db_pool_checked_out",
+        "Connections currently checked out of the pool.",
+        pool.checkedout,
+    )
+    Gauge(
+        "royaldocs_db_pool_overflow",
+        "Connections open beyond the pool size.",
+        pool.overflow,
+    )
+
+
+class MetricsMiddleware:
+    """ASGI middleware timing requests per method, route template and status.
+
+    The route template (e.g. ``/api/v1/docs/{doc_id}``) is taken from the
+    matched FastAPI route, so ids in paths do not create new series;
+    unmatched requests are grouped under ``<unmatched>``.
+    """
+
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def send_wrapper(message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            REQUEST_DURATION.observe(
+                time.perf_counter() - start,
+                scope["method"],
+                getattr(route, "path", "<unmatched>"),
+                str(status_code),
+            )
@@ -0,0 +1,73 @@
+"""Incremental reading of (optionally gzip-compressed) NDJSON request bodies."""
+
+import zlib
+from typing import AsyncIterable, AsyncIterator
+
+# Upper bound on the bytes produced by a single decompression step, so a
+# small, highly compressed chunk cannot expand into a huge buffer at once.
+_INFLATE_STEP = 64 * 1024
+
+
+async def inflate(chunks: AsyncIterable[bytes]) -> AsyncIterator[bytes]:
+    """Decompress a gzip stream chunk by chunk.
+
+    Concatenated gzip members (as written by ``pigz`` or by appending files)
+    are decompressed one after the other, like ``gunzip`` does.
+
+    Raises ``zlib.error`` if the stream is not valid gzip.
+    """
+    decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    async for chunk in chunks:
+        while chunk:
+            data = decompressor.decompress(chunk, _INFLATE_STEP)
+            while data:
+                yield data
+                data = decompressor.decompress(
+                    decompressor.unconsumed_tail, _INFLATE_STEP
+                )
+            # Bytes after the end of a member start the next one.
+            chunk = decompressor.unused_data
+            if chunk:
+                decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    tail = decompressor.flush()
+    if tail:
+        yield tail
+    if not decompressor.eof:
+        raise zlib.error("truncated gzip stream")
+
+
+async def iter_lines(
+    chunks: AsyncIterable[bytes], max_line_bytes: int
+) -> AsyncIterator[tuple[int, bytes | None]]:
+    """Split a byte stream into ``(line number, line)`` pairs, 1-based.
+
+    Blank lines are skipped. A line longer than ``max_line_bytes`` is never
+    buffered in full; it is reported as ``None`` and its bytes are discarded.
+    """
+    buffer = bytearray()
+    number = 0
+    oversized = False
+    async for chunk in chunks:
+        start = 0
+        while True:
+            end = chunk.find(b"\n", start)
+            if end == -1:
+                break
+            number += 1
+            if oversized or len(buffer) + end - start > max_line_bytes:
+                yield number, None
+            else:
+                buffer += chunk[start:end]
+                if buffer.strip():
+                    yield number, bytes(buffer)
+            buffer.clear()
+            oversized = False
+            start = end + 1
+        if not oversized:
+            buffer += chunk[start:]
+            if len(buffer) > max_line_bytes:
+                buffer.clear()
+                oversized = True
+    if oversized or buffer.strip():
+        number += 1
+        yield number, None if oversized else bytes(buffer)
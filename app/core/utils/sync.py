@@ -1,83 +1,337 @@
 """Utilities for syncronization task."""
 
 import asyncio
+import hashlib
 import logging
+import time
+import uuid
+from dataclasses import dataclass
 
 import httpx
-from sqlalchemy import select
-from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import bindparam, delete, func, select, update
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncSession
 
 from app.core.config import settings
-from app.core.db import async_session
-from app.core.models import Document
+from app.core.crud import token as token_crud
+from app.core.db import async_session, engine
+from app.core.models import Document, SyncLayer, SyncState
+from app.core.utils import metrics
+from app.core.utils.leader import (
+    acquire_leadership,
+    instance_name,
+    release_leadership,
+)
 
 logger = logging.getLogger(settings.PROJECT_NAME)
 
+SYNC_STATE_NAME = "documents"
+SYNC_HTTP_TIMEOUT = 10
 
-async def sync_loop() -> None:
+
+@dataclass
+class FetchState:
+    """Cache validators and hash of the last successfully applied payload."""
+
+    etag: str | None = None
+    last_modified: str | None = None
+    payload_hash: str | None = None
+
+    def remember(self, response: httpx.Response, payload_hash: str) -> None:
+        self.etag = response.headers.get("ETag")
+        self.last_modified = response.headers.get("Last-Modified")
+        self.payload_hash = payload_hash
+
+
+async def sync_loop(client: httpx.AsyncClient) -> None:
+    """Run the sync on one process of the cluster at a time.
+
+    Every process competes for the sync advisory lock; the holder runs the
+    sync, the others retry every ``SYNC_LEADER_RETRY_SECONDS``.
+    """
     while True:
         try:
-            async with async_session() as session:
-                await run_sync_once(session)
+            async with engine.connect() as lock_conn:
+                if await acquire_leadership(lock_conn):
+                    try:
+                        await _lead(lock_conn, client)
+                    finally:
+                        await release_leadership(lock_conn)
+                        logger.info("Released sync leadership.")
         except asyncio.CancelledError:
             logger.info("Sync loop cancelled, shutting down.")
             raise
+        except Exception:  # pylint: disable=broad-exception-caught
+            logger.exception(
+                "Sync leadership lost, will retry in %s s.",
+                settings.SYNC_LEADER_RETRY_SECONDS,
+            )
+        await asyncio.sleep(settings.SYNC_LEADER_RETRY_SECONDS)
+
+
+async def sync_once_as_leader(client: httpx.AsyncClient) -> bool:
+    """Run a single sync pass if no other process holds the sync lock.
+
+    Returns ``False``, without syncing, when the lock is taken.
+    """
+    async with engine.connect() as lock_conn:
+        if not await acquire_leadership(lock_conn):
+            return False
+        try:
+            async with async_session() as session:
+                await run_sync_once(session, client, FetchState())
+        finally:
+            await release_leadership(lock_conn)
+    return True
+
+
+async def _lead(lock_conn: AsyncConnection, client: httpx.AsyncClient) -> None:
+    logger.info("Acquired sync leadership as %s.", instance_name())
+    state = FetchState()
+    purge_due = 0.0
+    while True:
+        # Fails if the lock connection is gone, which means the lock is too.
+        # Rolled back at once, so the connection never idles in a transaction.
+        await lock_conn.execute(select(1))
+        await lock_conn.rollback()
+        try:
+            async with async_session() as session:
+                await run_sync_once(session, client, state)
         except Exception:  # pylint: disable=broad-exception-caught
             logger.exception(
                 "Sync task failed, will retry in %s s.",
                 settings.SYNC_INTERVAL_SECONDS,
             )
+        # Housekeeping of the refresh token denylist also runs on the leader
+        # only, keeping the DELETE off the login path.
+        if time.monotonic() >= purge_due:
+            try:
+                async with async_session() as session:
+                    await token_crud.purge_expired(session)
+                purge_due = time.monotonic() + settings.REVOKED_TOKEN_PURGE_SECONDS
+            except Exception:  # pylint: disable=broad-exception-caught
+                logger.exception("Could not purge expired revoked tokens.")
         await asyncio.sleep(settings.SYNC_INTERVAL_SECONDS)
 
 
-async def _fetch_payload() -> dict:
-    """Fetch JSON payload from the configured external URL."""
-    async with httpx.AsyncClient(timeout=10) as client:
-        response = await client.get(settings.SYNC_URL)
-        response.raise_for_status()
-        payload = response.json()
+async def _fetch_payload(
+    client: httpx.AsyncClient, state: FetchState
+) -> httpx.Response | None:
+    """Fetch the payload from the configured external URL.
 
-    if not isinstance(payload, dict):
-        logger.warning(
-            "Sync URL returned %s instead of a JSON object, skipping.",
-            type(payload).__name__,
+    Sends the validators of the last applied payload, so an unchanged upstream
+    can answer ``304 Not Modified``, in which case ``None`` is returned.
+    """
+    headers = {}
+    if state.etag:
+        headers["If-None-Match"] = state.etag
+    if state.last_modified:
+        headers["If-Modified-Since"] = state.last_modified
+
+    response = await client.get(settings.SYNC_URL, headers=headers)
+    if response.status_code == httpx.codes.NOT_MODIFIED:
+        return None
+    response.raise_for_status()
+    return response
+
+
+async def _publish_layer(session: AsyncSession, payload: dict) -> int | None:
+    """Store ``payload`` merged over the latest sync layer as a new version.
+
+    Readers overlay the latest layer onto document content, so a sync writes a
+    single row no matter how many documents exist. Returns the new version,
+    or ``None`` if the payload does not change the current layer.
+    """
+    latest = await session.scalar(
+        select(SyncLayer).order_by(SyncLayer.version.desc()).limit(1)
+    )
+    base = latest.payload if latest is not None else {}
+    merged = {**base, **payload}
+    if latest is not None and merged == base:
+        return None
+
+    layer = SyncLayer(payload=merged)
+    session.add(layer)
+    await session.flush()
+    await session.execute(
+        delete(SyncLayer).where(
+            SyncLayer.version <= layer.version - settings.SYNC_LAYER_HISTORY
+        )
+    )
+    await session.commit()
+    return layer.version
+
+
+def _merge_statement(payload: dict):
+    """Build a set-based UPDATE merging ``payload`` into every document root.
+
+    The merge runs inside PostgreSQL with the ``||`` operator, which has the
+    same shallow semantics as ``{**content, **payload}``. Rows whose content
+    already equals the merged result are filtered out, so unchanged documents
+    produce neither row versions nor WAL.
+    """
+    merged = Document.content.op("||")(bindparam("payload", payload, type_=JSONB))
+    return (
+        update(Document)
+        .where(merged != Document.content)
+        .values(content=merged, version=Document.version + 1)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def _merge_batch_statement(payload: dict, after: uuid.UUID | None, size: int):
+    """Build a statement merging ``payload`` into the next keyset chunk.
+
+    Selects up to ``size`` document ids ordered by primary key after ``after``,
+    updates the ones that change and returns the last id of the chunk together
+    with the number of updated rows.
+    """
+    batch_q = select(Document.id).order_by(Document.id).limit(size)
+    if after is not None:
+        batch_q = batch_q.where(Document.id > after)
+    batch = batch_q.cte("batch")
+
+    upd = (
+        _merge_statement(payload)
+        .where(Document.id.in_(select(batch.c.id)))
+        .returning(Document.id)
+        .cte("upd")
+    )
+
+    return select(
+        select(batch.c.id).order_by(batch.c.id.desc()).limit(1).scalar_subquery(),
+        select(func.count()).select_from(upd).scalar_subquery(),
+    )
+
+
+async def _merge_in_batches(
+    session: AsyncSession, payload: dict, payload_hash: str
+) -> int:
+    """Merge ``payload`` chunk by chunk, committing a checkpoint after each one.
+
+    The checkpoint is stored in the ``sync_state`` table within the same
+    transaction as the chunk, so an interrupted run resumes after the last
+    committed chunk as long as the upstream payload has not changed, and a
+    payload whose pass already completed is not merged again.
+    """
+    state = await session.get(SyncState, SYNC_STATE_NAME)
+    if state is None:
+        state = SyncState(name=SYNC_STATE_NAME)
+        session.add(state)
+
+    if state.payload_hash == payload_hash and state.cursor is None:
+        logger.debug("Sync payload already applied, skipping.")
+        return 0
+
+    after = state.cursor if state.payload_hash == payload_hash else None
+    if after is not None:
+        logger.info("Resuming sync after document %s.", after)
+
+    total = 0
+    while True:
+        result = await session.execute(
+            _merge_batch_statement(payload, after, settings.SYNC_BATCH_SIZE)
         )
-        return {}
+        last_id, changed = result.one()
+        total += changed
 
-    return payload
+        state.payload_hash = payload_hash
+        state.cursor = last_id
+        await session.commit()
 
+        if last_id is None:
+            return total
+        after = last_id
 
-async def run_sync_once(session: AsyncSession) -> None:
-    """Merge external payload into the root of every document."""
+
+async def run_sync_once(
+    session: AsyncSession, client: httpx.AsyncClient, state: FetchState
+) -> int:
+    """Run one sync pass (see :func:`_sync_once`), recording its metrics."""
+    start = time.perf_counter()
     try:
-        payload = await _fetch_payload()
+        changed = await _sync_once(session, client, state)
+    except Exception:
+        metrics.SYNC_FAILURES.inc()
+        raise
+    finally:
+        metrics.SYNC_DURATION.observe(time.perf_counter() - start)
+    metrics.SYNC_ROWS_MERGED.inc(amount=changed)
+    return changed
+
+
+async def _sync_once(
+    session: AsyncSession, client: httpx.AsyncClient, state: FetchState
+) -> int:
+    """Publish external payload as the sync layer overlaid on every document.
+
+    With ``SYNC_MATERIALIZE`` enabled the payload is also merged into the
+    stored content of every document. The database is not touched when the
+    upstream answers ``304`` or returns the same bytes as the last applied
+    payload.
+
+    Returns the number of documents whose stored content was changed.
+    """
+    try:
+        response = await _fetch_payload(client, state)
     except httpx.HTTPStatusError as e:
         logger.warning(
             "Sync HTTP error %s from %s, skipping.",
             e.response.status_code,
             settings.SYNC_URL,
         )
-        return
+        metrics.SYNC_SKIPPED.inc("http_error")
+        return 0
     except httpx.RequestError as e:
         logger.warning("Sync request failed (%s), skipping.", e)
-        return
+        metrics.SYNC_SKIPPED.inc("request_error")
+        return 0
 
-    if not payload:
-        return
+    if response is None:
+        logger.debug("Sync payload not modified, skipping.")
+        metrics.SYNC_SKIPPED.inc("not_modified")
+        return 0
 
-    result = await session.execute(select(Document))
-    docs = result.scalars().all()
+    payload_hash = hashlib.sha256(response.content).hexdigest()
+    if payload_hash == state.payload_hash:
+        state.remember(response, payload_hash)
+        logger.debug("Sync payload unchanged, skipping.")
+        metrics.SYNC_SKIPPED.inc("unchanged")
+        return 0
 
-    if not docs:
-        logger.debug("No documents to sync.")
-        return
+    payload = response.json()
+    if not isinstance(payload, dict):
+        logger.warning(
+            "Sync URL returned %s instead of a JSON object, skipping.",
+            type(payload).__name__,
+        )
+        metrics.SYNC_SKIPPED.inc("invalid_payload")
+        return 0
 
-    for doc in docs:
-        doc.content = {**doc.content, **payload}
+    if not payload:
+        state.remember(response, payload_hash)
+        metrics.SYNC_SKIPPED.inc("empty_payload")
+        return 0
 
-    await session.commit()
-    logger.info(
-        "Sync complete: merged %d key(s) into %d document(s).",
-        len(payload),
-        len(docs),
-    )
+    version = await _publish_layer(session, payload)
+    if version is not None:
+        logger.info(
+            "Published sync layer v%d: %d key(s) from upstream.", version, len(payload)
+        )
+
+    changed = 0
+    if settings.SYNC_MATERIALIZE and settings.SYNC_BATCH_SIZE > 0:
+        changed = await _merge_in_batches(session, payload, payload_hash)
+    elif settings.SYNC_MATERIALIZE:
+        result = await session.execute(_merge_statement(payload))
+        await session.commit()
+        changed = result.rowcount
+    state.remember(response, payload_hash)
+
+    if changed:
+        logger.info(
+            "Sync complete: merged %d key(s) into %d document(s).",
+            len(payload),
+            changed,
+        )
+    return changed
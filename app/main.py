@@ -2,14 +2,18 @@
 - Logging setup
 - CORS middleware
 - Database schema initialization
+- Single- and multi-process serving
 """
 
 import asyncio
 import logging
+import os
+import tempfile
 from contextlib import asynccontextmanager
 from pathlib import Path
 from typing import AsyncGenerator
 
+import httpx
 import uvicorn
 import yaml
 from fastapi import FastAPI
@@ -17,30 +21,56 @@ from starlette.middleware.cors import CORSMiddleware
 
 from app.api.main import api_v1_router
 from app.core.config import settings
-from app.core.db import init_superuser
+from app.core.db import engine, init_superuser
 from app.core.logging import setup_logger
-from app.core.utils.sync import sync_loop
+from app.core.security import password_pool
+from app.core.utils.docs import shutdown_diff_pool
+from app.core.utils import metrics
+from app.core.utils.metrics import MetricsMiddleware
+from app.core.utils.sync import SYNC_HTTP_TIMEOUT, sync_loop
 
 logger = logging.getLogger(settings.PROJECT_NAME)
 
+LOG_FILE = f"{settings.PROJECT_NAME}.log"
+
 
 @asynccontextmanager
 async def lifespan(_: FastAPI) -> AsyncGenerator[None, None]:
+    # Workers are separate processes that do not run main(), so each one sets
+    # up its own logger.
+    setup_logger(settings.PROJECT_NAME, LOG_FILE)
     await init_superuser()
-    logger.info(
-        "Starting background sync task (interval: %s s).",
-        settings.SYNC_INTERVAL_SECONDS,
-    )
-    sync_task = asyncio.create_task(sync_loop())
+    metrics_task = None
+    if settings.METRICS_DIR:
+        metrics_task = asyncio.create_task(metrics.flush_loop())
     try:
-        yield
+        if not settings.SYNC_IN_API:
+            logger.info("Background sync disabled, run `python -m app.sync` instead.")
+            yield
+            return
+
+        logger.info(
+            "Starting background sync task (interval: %s s).",
+            settings.SYNC_INTERVAL_SECONDS,
+        )
+        async with httpx.AsyncClient(timeout=SYNC_HTTP_TIMEOUT) as client:
+            sync_task = asyncio.create_task(sync_loop(client))
+            try:
+                yield
+            finally:
+                sync_task.cancel()
+                try:
+                    await sync_task
+                except asyncio.CancelledError:
+                    pass
+                logger.info("Background sync task stopped.")
     finally:
-        sync_task.cancel()
-        try:
-            await sync_task
-        except asyncio.CancelledError:
-            pass
-        logger.info("Background sync task stopped.")
+        if metrics_task is not None:
+            metrics_task.cancel()
+            metrics.REGISTRY.flush(settings.METRICS_DIR)
+        shutdown_diff_pool()
+        password_pool.shutdown()
+        await engine.dispose()
 
 
 def create_app() -> FastAPI:
@@ -58,6 +88,8 @@ def create_app() -> FastAPI:
             allow_headers=["*"],
         )
 
+    fastapi_app.add_middleware(MetricsMiddleware)
+
     fastapi_app.include_router(api_v1_router, prefix=settings.API_V1_PREFIX)
 
     return fastapi_app
@@ -66,34 +98,56 @@ def create_app() -> FastAPI:
 app = create_app()
 
 
-async def main() -> None:
+def main() -> None:
+    """Serve the API with ``UVICORN_WORKERS`` processes.
+
+    With more than one worker, uvicorn's supervisor binds the socket once and
+    starts the workers as fresh (spawned) processes sharing it. Each worker
+    imports the app itself, so it gets its own DB engine, caches and diff
+    pool. Workers that die are replaced; SIGINT/SIGTERM stop the workers,
+    which finish in-flight requests for up to
+    ``UVICORN_TIMEOUT_GRACEFUL_SHUTDOWN`` seconds.
+    """
 
-    setup_logger(settings.PROJECT_NAME, f"{settings.PROJECT_NAME}.log")
+    setup_logger(settings.PROJECT_NAME, LOG_FILE)
 
     log_cfg_path = Path("logging.yaml")
     log_config = yaml.safe_load(log_cfg_path.read_text(encoding="utf-8"))
+    # Same file, hence same pipeline, as the application logger.
+    log_config["handlers"]["queue"]["log_file"] = LOG_FILE
+
+    if settings.UVICORN_WORKERS > 1:
+        # Workers merge their metrics through this directory; they are
+        # spawned after this point and read it from the environment.
+        metrics_dir = settings.METRICS_DIR or tempfile.mkdtemp(
+            prefix=f"{settings.PROJECT_NAME}-metrics-"
+        )
+        metrics.reset_dir(metrics_dir)
+        os.environ["METRICS_DIR"] = metrics_dir
 
-    config = uvicorn.Config(
-        app=app,
+    logger.info(
+        "Starting server on %s:%s with %s worker(s)",
+        settings.UVICORN_HOST,
+        settings.UVICORN_PORT,
+        settings.UVICORN_WORKERS,
+    )
+
+    # Import string rather than the app object: workers must import the app
+    # on their own for multi-process serving.
+    uvicorn.run(
+        "app.main:app",
         host=settings.UVICORN_HOST,
         port=settings.UVICORN_PORT,
         log_config=log_config,
         log_level=settings.UVICORN_LOG_LEVEL,
         workers=settings.UVICORN_WORKERS,
         limit_concurrency=settings.UVICORN_LIMIT_CONCURRENCY,
+        timeout_graceful_shutdown=settings.UVICORN_TIMEOUT_GRACEFUL_SHUTDOWN,
     )
 
-    server = uvicorn.Server(config)
-
-    logger.info(
-        "Starting server on %s:%s", settings.UVICORN_HOST, settings.UVICORN_PORT
-    )
-
-    await server.serve()
-
 
 if __name__ == "__main__":
     try:
-        asyncio.run(main())
+        main()
     except KeyboardInterrupt:
         logger.info("Server stopped by user.")
@@ -0,0 +1,66 @@
+"""Standalone entry point for the document synchronization worker.
+
+Runs the same sync loop as the API lifespan, but in its own process, so that
+heavy ingestion does not compete with request handling:
+
+    python -m app.sync          # run forever
+    python -m app.sync --once   # run a single sync pass and exit
+
+Both take the sync advisory lock first. ``--once`` exits with status 1,
+without syncing, if another process is the sync leader.
+"""
+
+import argparse
+import asyncio
+import logging
+import sys
+
+import httpx
+
+from app.core.config import settings
+from app.core.db import engine
+from app.core.logging import setup_logger
+from app.core.utils.sync import (
+    SYNC_HTTP_TIMEOUT,
+    sync_loop,
+    sync_once_as_leader,
+)
+
+logger = logging.getLogger(settings.PROJECT_NAME)
+
+
+async def main(once: bool = False) -> int:
+
+    setup_logger(settings.PROJECT_NAME, f"{settings.PROJECT_NAME}.sync.log")
+
+    try:
+        async with httpx.AsyncClient(timeout=SYNC_HTTP_TIMEOUT) as client:
+            if once:
+                if not await sync_once_as_leader(client):
+                    logger.warning(
+                        "Another process is the sync leader, not syncing."
+                    )
+                    return 1
+            else:
+                logger.info(
+                    "Starting sync worker (interval: %s s, batch size: %s).",
+                    settings.SYNC_INTERVAL_SECONDS,
+                    settings.SYNC_BATCH_SIZE,
+                )
+                await sync_loop(client)
+    finally:
+        await engine.dispose()
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--once", action="store_true", help="run a single sync pass and exit"
+    )
+    args = parser.parse_args()
+
+    try:
+        sys.exit(asyncio.run(main(once=args.once)))
+    except KeyboardInterrupt:
+        logger.info("Sync worker stopped by user.")
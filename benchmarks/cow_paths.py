@@ -0,0 +1,78 @@
+"""Microbenchmark: copy-on-write JSON Patch versus a full ``deepcopy``.
+
+Applies a one-operation JSON Patch (``replace`` of one leaf) to synthetic
+documents of several sizes and path depths, once by deep-copying the whole
+content and patching the copy (the previous ``apply_patch``), once with the
+structural-sharing ``apply_patch`` that ``PATCH /docs/{id}`` runs today.
+Needs the same environment variables as the application, e.g.:
+
+    docker compose exec royal_docs_api python -m benchmarks.cow_paths
+"""
+
+import argparse
+import copy
+import functools
+import json
+import timeit
+
+from app.core.schemas.document import JsonPatchOperation
+from app.core.utils.jsonpatch import apply_patch
+
+
+def build_document(size_bytes: int, depth: int) -> tuple[dict, str]:
+    """Document of roughly ``size_bytes`` of JSON and a leaf pointer ``depth`` deep."""
+    keys = [f"level{i}" for i in range(depth)]
+    record = {"name": "x" * 40, "tags": ["a", "b", "c"], "value": 1.5}
+    per_record = len(json.dumps(record)) + 16
+    content: dict = {
+        f"bulk{i}": dict(record) for i in range(max(1, size_bytes // per_record))
+    }
+    node = content
+    for key in keys[:-1]:
+        node = node.setdefault(key, {"sibling": dict(record)})
+    node[keys[-1]] = 0
+    return content, "/" + "/".join(keys)
+
+
+def deepcopy_patch(content: dict, operations: list[JsonPatchOperation]) -> dict:
+    return apply_patch(copy.deepcopy(content), operations)
+
+
+def run(sizes_mb: list[float], depths: list[int], repeat: int) -> None:
+    print(f"{'size':>8} {'depth':>6} {'deepcopy':>12} {'cow':>12} {'speedup':>9}")
+    for size_mb in sizes_mb:
+        for depth in depths:
+            content, pointer = build_document(int(size_mb * 1024 * 1024), depth)
+            operations = [
+                JsonPatchOperation(op="replace", path=pointer, value=1),
+            ]
+            number = max(1, round(repeat / max(size_mb, 1)))
+            full = min(
+                timeit.repeat(
+                    functools.partial(deepcopy_patch, content, operations),
+                    number=number,
+                    repeat=3,
+                )
+            )
+            cow = min(
+                timeit.repeat(
+                    functools.partial(apply_patch, content, operations),
+                    number=number,
+                    repeat=3,
+                )
+            )
+            print(
+                f"{size_mb:>6.1f}MB {depth:>6} {full / number * 1e3:>10.3f}ms"
+                f" {cow / number * 1e3:>10.3f}ms {full / cow:>8.0f}x"
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--sizes", type=float, nargs="+", default=[0.1, 1, 5, 20], help="in MB"
+    )
+    parser.add_argument("--depths", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+    run(args.sizes, args.depths, args.repeat)
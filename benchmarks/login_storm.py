@@ -0,0 +1,103 @@
+"""Benchmark: document read latency during a login storm.
+
+Against a running server, measures ``GET /docs/{id}`` latency first on its
+own, then while ``--logins`` clients log in back to back. With bcrypt on the
+event loop every login stalled all reads in that worker; with the password
+pool reads should stay close to the baseline and excess logins get 503:
+
+    python -m benchmarks.login_storm --url http://localhost:8000/api/v1 \\
+        --username test --password test
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+
+async def login(client: httpx.AsyncClient, username: str, password: str) -> int:
+    response = await client.post(
+        "/auth", data={"username": username, "password": password}
+    )
+    return response.status_code
+
+
+async def read_loop(
+    client: httpx.AsyncClient, doc_id: str, deadline: float, latencies: list[float]
+) -> None:
+    while time.monotonic() < deadline:
+        start = time.perf_counter()
+        response = await client.get(f"/docs/{doc_id}")
+        response.raise_for_status()
+        latencies.append(time.perf_counter() - start)
+
+
+async def login_loop(
+    client: httpx.AsyncClient,
+    username: str,
+    password: str,
+    deadline: float,
+    statuses: dict[int, int],
+) -> None:
+    while time.monotonic() < deadline:
+        code = await login(client, username, password)
+        statuses[code] = statuses.get(code, 0) + 1
+
+
+def report(name: str, latencies: list[float]) -> None:
+    ms = sorted(x * 1e3 for x in latencies)
+    p99 = ms[min(len(ms) - 1, int(len(ms) * 0.99))]
+    print(
+        f"{name:>10}: {len(ms):>6} reads  p50 {statistics.median(ms):8.2f}ms"
+        f"  p99 {p99:8.2f}ms  max {ms[-1]:8.2f}ms"
+    )
+
+
+async def run(args: argparse.Namespace) -> None:
+    async with httpx.AsyncClient(base_url=args.url, timeout=30) as client:
+        response = await client.post(
+            "/auth", data={"username": args.username, "password": args.password}
+        )
+        response.raise_for_status()
+        token = response.json()["access_token"]
+        client.headers["Authorization"] = f"Bearer {token}"
+        response = await client.post(
+            "/docs", json={"title": "login storm", "content": {"a": 1}}
+        )
+        response.raise_for_status()
+        doc_id = response.json()["id"]
+
+        for name, logins in (("baseline", 0), ("storm", args.logins)):
+            deadline = time.monotonic() + args.duration
+            latencies: list[float] = []
+            statuses: dict[int, int] = {}
+            await asyncio.gather(
+                *(
+                    read_loop(client, doc_id, deadline, latencies)
+                    for _ in range(args.readers)
+                ),
+                *(
+                    login_loop(
+                        client, args.username, args.password, deadline, statuses
+                    )
+                    for _ in range(logins)
+                ),
+            )
+            report(name, latencies)
+            if statuses:
+                print(f"{'':>10}  login status codes: {statuses}")
+
+        await client.delete(f"/docs/{doc_id}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default="http://localhost:8000/api/v1")
+    parser.add_argument("--username", default="test")
+    parser.add_argument("--password", default="test")
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--logins", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=10, help="per phase, s")
+    asyncio.run(run(parser.parse_args()))
@@ -0,0 +1,20 @@
+"""Settings required to import the application without a ``.env`` file."""
+
+import os
+
+for name, value in {
+    "INSTANCE_ID": "1",
+    "HOST_ID": "1",
+    "SECRET_KEY": "test",
+    "POSTGRES_HOST": "localhost",
+    "POSTGRES_PORT": "5432",
+    "POSTGRES_DB": "royaldocs",
+    "POSTGRES_USERNAME": "royaldocs",
+    "POSTGRES_PASSWORD": "royaldocs",
+    "UVICORN_HOST": "127.0.0.1",
+    "UVICORN_PORT": "8000",
+    "UVICORN_LOG_LEVEL": "info",
+    "UVICORN_WORKERS": "1",
+    "UVICORN_LIMIT_CONCURRENCY": "100",
+}.items():
+    os.environ.setdefault(name, value)
@@ -0,0 +1,52 @@
+"""Recovery of the diff process pool after a worker died."""
+
+import asyncio
+import json
+import os
+import uuid
+from concurrent.futures.process import BrokenProcessPool
+from types import SimpleNamespace
+
+import pytest
+
+from app.core.config import settings
+from app.core.utils import docs
+
+
+class _Session:
+    def __init__(self, rows):
+        self.rows = rows
+
+    async def execute(self, _):
+        return self.rows
+
+
+@pytest.fixture(name="broken_pool")
+def fixture_broken_pool(monkeypatch):
+    monkeypatch.setattr(settings, "DIFF_WORKERS", 1)
+    docs.shutdown_diff_pool()
+    pool = docs.diff_pool()
+    with pytest.raises(BrokenProcessPool):
+        pool.submit(os._exit, 1).result()  # pylint: disable=protected-access
+    yield pool
+    docs.shutdown_diff_pool()
+
+
+def test_broken_pool_is_replaced(broken_pool):
+    owner, base, target = uuid.uuid4(), uuid.uuid4(), uuid.uuid4()
+    rows = [
+        SimpleNamespace(id=base, owner_id=owner, content={"a": 1}, layer=None),
+        SimpleNamespace(id=target, owner_id=owner, content={"a": 2}, layer=None),
+    ]
+
+    async def run() -> list[dict]:
+        lines = await docs.diff_own_docs_many(
+            base, [target], owner, _Session(rows)
+        )
+        return [json.loads(line) async for line in lines]
+
+    (line,) = asyncio.run(run())
+
+    assert line["target"] == str(target)
+    assert line["diff"]["changed"] == {"a": {"old": 1, "new": 2}}
+    assert docs.diff_pool() is not broken_pool
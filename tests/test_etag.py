@@ -0,0 +1,14 @@
+"""Entity tag comparison for conditional requests."""
+
+from app.core.utils.docs import etag_matches, make_etag
+
+
+def test_etag_matches():
+    etag = make_etag(3, 1)
+
+    assert etag_matches('"1.1", W/"3.1"', etag)
+    assert not etag_matches('"3.2"', etag)
+
+
+def test_non_ascii_digits_do_not_match():
+    assert not etag_matches('"³.1"', make_etag(3, 1))
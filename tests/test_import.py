@@ -0,0 +1,37 @@
+"""Partial results of an NDJSON import aborted by a corrupt body."""
+
+import asyncio
+import gzip
+import json
+import uuid
+
+import pytest
+from fastapi import HTTPException
+
+from app.core.config import settings
+from app.core.utils import docs
+from app.core.utils.ndjson import inflate
+
+
+async def _chunks(data: bytes):
+    yield data
+
+
+def test_corrupt_gzip_reports_committed_rows(monkeypatch):
+    copied = []
+
+    async def copy_documents(session, records):  # pylint: disable=unused-argument
+        copied.extend(records)
+
+    monkeypatch.setattr(docs, "_copy_documents", copy_documents)
+    monkeypatch.setattr(settings, "DOCS_IMPORT_BATCH_SIZE", 2)
+    lines = "".join(
+        json.dumps({"title": f"doc {i}", "content": {}}) + "\n" for i in range(3)
+    )
+    body = gzip.compress(lines.encode()) + b"\x1f\x8b not gzip"
+
+    with pytest.raises(HTTPException) as excinfo:
+        asyncio.run(docs.import_own_docs(inflate(_chunks(body)), uuid.uuid4(), None))
+
+    assert excinfo.value.status_code == 400
+    assert excinfo.value.detail["imported"] == len(copied) == 2
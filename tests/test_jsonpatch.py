@@ -0,0 +1,23 @@
+"""Array indexes in JSON Patch paths."""
+
+import pytest
+from fastapi import HTTPException
+
+from app.core.schemas.document import JsonPatchOperation
+from app.core.utils.jsonpatch import apply_patch
+
+
+def _patch(content, **operation):
+    return apply_patch(content, [JsonPatchOperation.model_validate(operation)])
+
+
+def test_array_index():
+    assert _patch({"a": [1, 2]}, op="replace", path="/a/1", value=3) == {"a": [1, 3]}
+
+
+@pytest.mark.parametrize("token", ["²", "١", "01", "-1", "x"])
+def test_invalid_array_index_is_a_conflict(token):
+    with pytest.raises(HTTPException) as excinfo:
+        _patch({"a": [1, 2]}, op="replace", path=f"/a/{token}", value=3)
+
+    assert excinfo.value.status_code == 409
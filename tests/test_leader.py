@@ -0,0 +1,24 @@
+"""Identity of the sync leader."""
+
+import os
+
+from app.core.config import settings
+from app.core.utils import leader
+
+
+def test_instance_name_fits_application_name(monkeypatch):
+    monkeypatch.setattr(settings, "PROJECT_NAME", "Royal" * 10)
+    monkeypatch.setattr(settings, "HOST_ID", "höst-" * 10)
+
+    name = leader.instance_name()
+
+    assert len(name.encode()) <= 63
+    assert name.endswith(f":{os.getpid()}")
+
+
+def test_is_leader_compares_backend_pid(monkeypatch):
+    monkeypatch.setattr(leader, "_lock_backend_pid", 42)
+
+    assert leader.is_leader({"instance": "renamed", "backend_pid": 42})
+    assert not leader.is_leader({"instance": leader.instance_name(), "backend_pid": 7})
+    assert not leader.is_leader(None)
@@ -0,0 +1,33 @@
+"""Logging pipeline shared by uvicorn and the application logger."""
+
+import logging.config
+import threading
+
+from app.core import logging as app_logging
+
+
+def _listener_threads() -> int:
+    return sum("_monitor" in t.name for t in threading.enumerate())
+
+
+def test_dict_config_and_setup_logger_share_one_pipeline(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    threads = _listener_threads()
+
+    logging.config.dictConfig(
+        {
+            "version": 1,
+            "disable_existing_loggers": False,
+            "handlers": {
+                "queue": {
+                    "()": "app.core.logging.queue_handler",
+                    "log_file": "test.log",
+                }
+            },
+            "loggers": {"test.uvicorn": {"handlers": ["queue"]}},
+        }
+    )
+    logger = app_logging.setup_logger("test.app", str(tmp_path / "test.log"))
+
+    assert logging.getLogger("test.uvicorn").handlers == logger.handlers
+    assert _listener_threads() == threads + 1
@@ -0,0 +1,35 @@
+"""Decompression and line splitting of NDJSON import bodies."""
+
+import asyncio
+import gzip
+import zlib
+
+import pytest
+
+from app.core.utils.ndjson import inflate
+
+
+async def _chunks(data: bytes, size: int):
+    for start in range(0, len(data), size):
+        yield data[start : start + size]
+
+
+def _inflate(data: bytes, size: int) -> bytes:
+    async def collect() -> bytes:
+        return b"".join([part async for part in inflate(_chunks(data, size))])
+
+    return asyncio.run(collect())
+
+
+@pytest.mark.parametrize("size", [1, 7, 1 << 16])
+def test_inflate_multi_member(size):
+    body = gzip.compress(b"line1\n") + gzip.compress(b"") + gzip.compress(b"line2\n")
+
+    assert _inflate(body, size) == b"line1\nline2\n"
+
+
+def test_inflate_truncated_member():
+    body = gzip.compress(b"line1\n") + gzip.compress(b"line2\n")[:-4]
+
+    with pytest.raises(zlib.error):
+        _inflate(body, 1 << 16)
@@ -0,0 +1,56 @@
+"""Path writes to keys provided by the sync layer."""
+
+import asyncio
+import uuid
+
+import pytest
+from fastapi import HTTPException
+
+from app.core.utils import docs
+
+
+class _Session:
+    """Session whose UPDATE matches no row; ``synced`` answers the layer check."""
+
+    def __init__(self, synced: bool):
+        self.synced = synced
+        self.statements = []
+
+    async def execute(self, statement):
+        self.statements.append(statement)
+        return self
+
+    def one_or_none(self):
+        return None
+
+    async def rollback(self):
+        pass
+
+    async def scalar(self, _):
+        return self.synced
+
+
+@pytest.fixture(autouse=True)
+def fixture_etag(monkeypatch):
+    async def get_own_etag(*_):
+        return docs.make_etag(1, 1)
+
+    monkeypatch.setattr(docs, "get_own_etag", get_own_etag)
+
+
+@pytest.mark.parametrize(
+    "mutation",
+    [
+        lambda s: docs.set_own_path(uuid.uuid4(), uuid.uuid4(), "a/b", 1, s),
+        lambda s: docs.delete_own_path(uuid.uuid4(), uuid.uuid4(), "a/b", s),
+    ],
+    ids=["set", "delete"],
+)
+@pytest.mark.parametrize("synced, code", [(True, 409), (False, 404)])
+def test_synced_key_is_a_conflict(mutation, synced, code):
+    session = _Session(synced)
+
+    with pytest.raises(HTTPException) as excinfo:
+        asyncio.run(mutation(session))
+
+    assert excinfo.value.status_code == code